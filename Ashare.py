@@ -1,29 +1,71 @@
 #-*- coding:utf-8 -*-    --------------Ashare 股票行情数据双核心版( https://github.com/mpquant/Ashare ) 
-import json,requests,datetime;      import pandas as pd  #
+import json,requests,datetime,threading,time;      import numpy as np;  import pandas as pd  #
+try:    import orjson;  _loads=orjson.loads                              #可选：更快的JSON解析库
+except ImportError:     _loads=json.loads
+from concurrent.futures import ThreadPoolExecutor;  from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter;          from urllib3.util.retry import Retry
+
+#网络配置：连接池复用(keep-alive)、超时、重试、按主机限速；接口地址可改成本地假服务器做测试
+SINA_URL='http://money.finance.sina.com.cn/quotes_service/api/json_v2.php/CN_MarketData.getKLineData'
+TX_DAY_URL='http://web.ifzq.gtimg.cn/appstock/app/fqkline/get'
+TX_MIN_URL='http://ifzq.gtimg.cn/appstock/app/kline/mkline'
+TIMEOUT=(3.05,10)             #(连接超时,读取超时)秒，不会再因为卡住的连接无限等待
+RETRIES=2                     #连接失败、5xx时自动重试次数(指数退避)
+POOL_SIZE=16                  #每个主机保持的长连接数
+RATE_LIMIT={}                 #每个主机每秒最多请求数，如 {'money.finance.sina.com.cn':10}，未列出的主机用 DEFAULT_RATE，0为不限
+DEFAULT_RATE=20
+
+_local=threading.local();   _rate_lock=threading.Lock();   _next_slot={}
+_pools={};   _pools_lock=threading.Lock()
+
+def _session():                                                          #每个线程一个Session(requests.Session不保证线程安全)，连接池复用TCP/TLS连接
+    s=getattr(_local,'session',None)
+    if s is None:
+        r=Retry(total=RETRIES,backoff_factor=0.3,status_forcelist=[500,502,503,504],allowed_methods=['GET'])
+        a=HTTPAdapter(pool_connections=POOL_SIZE,pool_maxsize=POOL_SIZE,max_retries=r)
+        s=requests.Session();  s.mount('http://',a);  s.mount('https://',a);  _local.session=s
+    return s
+
+def _throttle(url):                                                      #按主机限速：相邻两次请求至少间隔 1/rate 秒
+    host=urlsplit(url).hostname;  rate=RATE_LIMIT.get(host,DEFAULT_RATE)
+    if not rate: return
+    with _rate_lock:
+        now=time.monotonic();  t=max(now,_next_slot.get(host,0));  _next_slot[host]=t+1/rate
+    if t>now: time.sleep(t-now)
+
+#解析：JSON直接解析成 float64 数组和 datetime64 索引，不再先建字符串DataFrame再逐列 astype/to_datetime
+def _decode_sina(content):                                               #新浪 [{"day","open","high","low","close","volume",...}, ...]
+    d=_loads(content) or [];   idx=pd.DatetimeIndex(np.array([r['day'] for r in d],dtype='datetime64[ns]'),name='')
+    return pd.DataFrame({k:np.array([r[k] for r in d],dtype=float) for k in ('open','high','low','close','volume')},index=idx)
+
+def _decode_tx(rows, minute=False):                                      #腾讯 [[time,open,close,high,low,volume,...], ...]，多出的字段忽略
+    t=[f'{s[:4]}-{s[4:6]}-{s[6:8]}T{s[8:10]}:{s[10:12]}' for s in (r[0] for r in rows)] if minute else [r[0] for r in rows]   #分钟线 YYYYMMDDHHMM 按固定位置切成ISO格式
+    idx=pd.DatetimeIndex(np.array(t,dtype='datetime64[ns]'),name='')     #ISO日期由numpy直接解析
+    return pd.DataFrame({k:np.array([r[i] for r in rows],dtype=float) for i,k in enumerate(('open','close','high','low','volume'),1)},index=idx)
+
+def _get(url):                                                           #统一的GET：限速、复用连接、超时，HTTP错误抛异常
+    _throttle(url);  r=_session().get(url,timeout=TIMEOUT);  r.raise_for_status()
+    return r.content
 
 #腾讯日线
 def get_price_day_tx(code, end_date='', count=10, frequency='1d'):     #日线获取  
     unit='week' if frequency in '1w' else 'month' if frequency in '1M' else 'day'     #判断日线，周线，月线
     if end_date:  end_date=end_date.strftime('%Y-%m-%d') if isinstance(end_date,datetime.date) else end_date.split(' ')[0]
     end_date='' if end_date==datetime.datetime.now().strftime('%Y-%m-%d') else end_date   #如果日期今天就变成空    
-    URL=f'http://web.ifzq.gtimg.cn/appstock/app/fqkline/get?param={code},{unit},,{end_date},{count},qfq'     
-    st= json.loads(requests.get(URL).content);    ms='qfq'+unit;      stk=st['data'][code]   
+    URL=f'{TX_DAY_URL}?param={code},{unit},,{end_date},{count},qfq'     
+    st= _loads(_get(URL));    ms='qfq'+unit;      stk=st['data'][code]   
     buf=stk[ms] if ms in stk else stk[unit]       #指数返回不是qfqday,是day
-    df=pd.DataFrame(buf,columns=['time','open','close','high','low','volume'],dtype='float')     
-    df.time=pd.to_datetime(df.time);    df.set_index(['time'], inplace=True);   df.index.name=''          #处理索引 
-    return df
+    return _decode_tx(buf)
 
 #腾讯分钟线
 def get_price_min_tx(code, end_date=None, count=10, frequency='1d'):    #分钟线获取 
     ts=int(frequency[:-1]) if frequency[:-1].isdigit() else 1           #解析K线周期数
     if end_date: end_date=end_date.strftime('%Y-%m-%d') if isinstance(end_date,datetime.date) else end_date.split(' ')[0]        
-    URL=f'http://ifzq.gtimg.cn/appstock/app/kline/mkline?param={code},m{ts},,{count}' 
-    st= json.loads(requests.get(URL).content);       buf=st['data'][code]['m'+str(ts)] 
-    df=pd.DataFrame(buf,columns=['time','open','close','high','low','volume','n1','n2'])   
-    df=df[['time','open','close','high','low','volume']]    
-    df[['open','close','high','low','volume']]=df[['open','close','high','low','volume']].astype('float')
-    df.time=pd.to_datetime(df.time);   df.set_index(['time'], inplace=True);   df.index.name=''          #处理索引     
-    df['close'][-1]=float(st['data'][code]['qt'][code][3])                #最新基金数据是3位的
+    URL=f'{TX_MIN_URL}?param={code},m{ts},,{count}' 
+    st= _loads(_get(URL));       buf=st['data'][code]['m'+str(ts)] 
+    df=_decode_tx(buf,minute=True)
+    qt=st['data'][code]['qt'][code];   df.iloc[-1,df.columns.get_loc('close')]=float(qt[3])   #最新基金数据是3位的
+    qtime=str(qt[30]) if len(qt)>30 else '';   df.attrs['quote_time']=pd.Timestamp(qtime[:14]) if len(qtime)>=8 and qtime[:8].isdigit() else None   #实时报价时间 YYYYMMDDHHMMSS，解析不了为None
     return df
 
 
@@ -36,13 +78,8 @@ def get_price_sina(code, end_date='', count=10, frequency='60m'):    #新浪全
         unit=4 if frequency=='1200m' else 29 if frequency=='7200m' else 1    #4,29多几个数据不影响速度
         count=count+(datetime.datetime.now()-end_date).days//unit            #结束时间到今天有多少天自然日(肯定 >交易日)        
         #print(code,end_date,count)    
-    URL=f'http://money.finance.sina.com.cn/quotes_service/api/json_v2.php/CN_MarketData.getKLineData?symbol={code}&scale={ts}&ma=5&datalen={count}' 
-    dstr= json.loads(requests.get(URL).content);       
-    #df=pd.DataFrame(dstr,columns=['day','open','high','low','close','volume'],dtype='float') 
-    df= pd.DataFrame(dstr,columns=['day','open','high','low','close','volume'])
-    df['open'] = df['open'].astype(float); df['high'] = df['high'].astype(float);                          #转换数据类型
-    df['low'] = df['low'].astype(float);   df['close'] = df['close'].astype(float);  df['volume'] = df['volume'].astype(float)    
-    df.day=pd.to_datetime(df.day);    df.set_index(['day'], inplace=True);     df.index.name=''            #处理索引                 
+    URL=f'{SINA_URL}?symbol={code}&scale={ts}&ma=5&datalen={count}' 
+    df=_decode_sina(_get(URL))
     if (end_date!='') & (frequency in ['240m','1200m','7200m']): return df[df.index<=end_date][-mcount:]   #日线带结束时间先返回              
     return df
 
@@ -52,12 +89,25 @@ def get_price(code, end_date='',count=10, frequency='1d', fields=[]):        #
 
     if  frequency in ['1d','1w','1M']:   #1d日线  1w周线  1M月线
          try:    return get_price_sina( xcode, end_date=end_date,count=count,frequency=frequency)   #主力
-         except: return get_price_day_tx(xcode,end_date=end_date,count=count,frequency=frequency)   #备用                    
+         except Exception: return get_price_day_tx(xcode,end_date=end_date,count=count,frequency=frequency)   #备用                    
     
     if  frequency in ['1m','5m','15m','30m','60m']:  #分钟线 ,1m只有腾讯接口  5分钟5m   60分钟60m
          if frequency in '1m': return get_price_min_tx(xcode,end_date=end_date,count=count,frequency=frequency)
          try:    return get_price_sina(  xcode,end_date=end_date,count=count,frequency=frequency)   #主力   
-         except: return get_price_min_tx(xcode,end_date=end_date,count=count,frequency=frequency)   #备用
+         except Exception: return get_price_min_tx(xcode,end_date=end_date,count=count,frequency=frequency)   #备用
+        
+def _pool(max_workers):                                                   #常驻线程池(按 max_workers 各一个)：线程不随调用结束退出，各线程的Session和keep-alive连接在多次 get_prices 之间复用
+    with _pools_lock:
+        pool=_pools.get(max_workers)
+        if pool is None: pool=_pools[max_workers]=ThreadPoolExecutor(max_workers=max(1,max_workers),thread_name_prefix='ashare')
+    return pool
+
+def get_prices(codes, end_date='', count=10, frequency='1d', max_workers=8):     #批量并发获取多只股票，返回 {code: DataFrame}，获取失败的为 None
+    codes=list(codes)
+    def one(code):
+        try:    return get_price(code,end_date=end_date,count=count,frequency=frequency)
+        except Exception: return None
+    return dict(zip(codes,_pool(max_workers).map(one,codes)))       #并发数受 max_workers 和各主机限速 RATE_LIMIT 共同约束
         
 if __name__ == '__main__':    
     df=get_price('sh000001',frequency='1d',count=10)      #支持'1d'日, '1w'周, '1M'月  
@@ -66,4 +116,7 @@ if __name__ == '__main__':
     df=get_price('000001.XSHG',frequency='15m',count=10)  #支持'1m','5m','15m','30m','60m'
     print('上证指数分钟线\n',df)
 
+    dfs=get_prices(['sh600900','sh601288','sz000001'],frequency='1d',count=5)   #批量并发获取
+    for code,df in dfs.items(): print(code,'\n',df)
+
 # Ashare 股票行情数据( https://github.com/mpquant/Ashare ) 
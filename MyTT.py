@@ -1,8 +1,84 @@
 # MyTT 麦语言-通达信-同花顺指标实现    https://github.com/mpquant/MyTT
 # V2.1 2021-6-6 新增 BARSLAST函数
 # V2.2 2021-6-8 新增 SLOPE,FORCAST线性回归，和回归预测函数
+# 批量计算：0级、1级序列函数和2级指标除接受一维序列外，也接受二维数组或宽表DataFrame(行=时间，列=股票)，
+#   沿时间轴一次算完全部股票，每列结果与单独对该列计算一致。各列上市日期不同时在前面补NaN即可，
+#   均线类结果在上市满N根后才有值；注意 IF/COUNT 中与NaN比较的结果为False，按0计入(PSY、VR、DMI)。
+#   RET、LAST、BARSLAST、SLOPE、FORCAST 返回单个值，只支持一维序列。
   
-import numpy as np; import pandas as pd
+import numpy as np; import pandas as pd; import threading, time; from functools import wraps
+try:    from scipy.signal import lfilter as _lfilter     #可选：有scipy时SMA用IIR滤波递推，否则用pandas ewm
+except ImportError: _lfilter=None
+
+#------------------ 滚动窗口引擎：直接在numpy数组上计算，不为每次调用构造pandas Series ------------------
+#  窗口内有NaN(求和类还包括±inf)时结果为NaN，前N-1个为NaN，与 pandas rolling(N) 一致；沿第0轴(时间)计算
+from numpy.lib.stride_tricks import sliding_window_view as _windows
+_CHUNK=1<<22                                         #窗口视图分块计算，每块最多约 _CHUNK 个元素 (行数 x 列数 x N)
+_BLOCK=1<<10                                         #分块前缀和的块长
+
+def _f(S):       return np.asarray(S,dtype=float)    #统一转为float数组
+
+def _rolling_count(M,N):                             #布尔掩码M在每个窗口内为True的个数(整数前缀和相减，精确)
+    K=np.concatenate([np.zeros((1,)+M.shape[1:],dtype=np.int64),np.cumsum(M,axis=0)]);   return K[N:]-K[:-N]
+
+def _rolling_sum(S,N):                               #分块前缀和相减 O(n)：前缀和每 L 行重新开始，误差只与 L 行的量级有关，NaN、±inf单独计数
+    X=_f(S);  N=int(N);  n=len(X);  R=np.full(X.shape,np.nan)
+    if N<1 or n<N: return R
+    NF=~np.isfinite(X);  L=max(N,min(_BLOCK,n));  k=-(-n//L);  D=X.shape[1:]
+    V=np.zeros((k*L,)+D);  V[:n]=np.where(NF,0,X)   #非有限值不进前缀和，否则 inf 会污染整块及下一块的所有窗口
+    C=np.cumsum(V.reshape((k,L)+D),axis=1).reshape((k*L,)+D);   T=C[L-1::L]   #块内前缀和、各块总和
+    t=np.arange(N-1,n);  s=t-N;  b=t//L                                      #窗口(s,t]，s在t的同一块或上一块
+    E=(-1,)+(1,)*len(D)
+    CS=np.where((s>=0).reshape(E), C[np.maximum(s,0)], 0)
+    TP=np.where(((s>=0)&(s<b*L)).reshape(E), T[np.maximum(b-1,0)], 0)
+    R[N-1:]=np.where(_rolling_count(NF,N)>0, np.nan, C[t]-CS+TP)   #与 pandas rolling(N) 一致：窗口内有NaN或±inf时为NaN，移出窗口后恢复
+    return R
+
+def _rolling_extreme(S,N,F):                         #van Herk/Gil-Werman 分块前缀/后缀极值 O(n)，F=np.maximum/np.minimum
+    X=_f(S);  N=int(N);  n=len(X);  R=np.full(X.shape,np.nan)
+    if N<1 or n<N: return R
+    k=-(-n//N);  B=np.full((k*N,)+X.shape[1:],np.nan);  B[:n]=X;  B=B.reshape((k,N)+X.shape[1:])
+    P=F.accumulate(B,axis=1).reshape((k*N,)+X.shape[1:])                    #块内前缀极值
+    Q=F.accumulate(B[:,::-1],axis=1)[:,::-1].reshape((k*N,)+X.shape[1:])    #块内后缀极值
+    R[N-1:]=F(Q[:n-N+1],P[N-1:n])                    #窗口[i,i+N-1]=后缀[i]与前缀[i+N-1]
+    return R
+
+def _rolling_apply(S,N,F):                           #F(窗口视图)->每个窗口一个值，按块计算
+    X=_f(S);  N=int(N);  n=len(X);  R=np.full(X.shape,np.nan)
+    if N<1 or n<N: return R
+    B=max(1,_CHUNK//(N*max(1,X[0].size)))           #每块的行数
+    for i in range(0,n-N+1,B):
+        W=_windows(X[i:i+B+N-1],N,axis=0);  R[N-1+i:N-1+i+len(W)]=F(W)
+    return R
+
+def _std(W):     return W.std(axis=-1)
+def _avedev(W):  return np.abs(W-W.mean(axis=-1,keepdims=True)).mean(axis=-1)
+
+#------------------ 公共子表达式缓存：SHARED() 范围内，同一输入数组+同样参数的0级函数只算一次 ------------------
+#  用于一次算多个指标(见 indicator_plan.py)：BIAS 里重复的 MA、BOLL 里重复的 STD、KDJ/WR/TAQ 的 HHV/LLV 等都只算一次
+#  按输入数组对象(id)识别，缓存期间保留输入的引用，id 不会被复用；缓存的结果设为只读，防止被调用方改写
+_memo=threading.local()
+
+class SHARED:                                        # with SHARED() as st:  ...  st.stats 为本次的复用统计
+    def __enter__(self):
+        self.outer=(getattr(_memo,'cache',None),getattr(_memo,'stats',None));  self.stats={}
+        _memo.cache={};  _memo.stats=self.stats;  return self
+    def __exit__(self,*exc):
+        _memo.cache,_memo.stats=self.outer
+
+def _shared(F):                                      #0级函数装饰器：不在 SHARED() 范围内时直接计算
+    @wraps(F)
+    def W(S,*args,**kw):
+        C=getattr(_memo,'cache',None)
+        if C is None: return F(S,*args,**kw)
+        K=(F.__name__,id(S))+args+tuple(sorted(kw.items()));  T=_memo.stats.setdefault(F.__name__,[0,0,0.0])  #[请求次数,计算次数,节省秒数]
+        T[0]+=1;  H=C.get(K)
+        if H is not None and H[0] is S:  T[2]+=H[2];  return H[1]
+        t=time.perf_counter();  R=F(S,*args,**kw);  dt=time.perf_counter()-t
+        if isinstance(R,np.ndarray): R.flags.writeable=False
+        C[K]=(S,R,dt);  T[1]+=1
+        return R
+    return W
 
 #------------------ 0级：核心工具函数 --------------------------------------------      
 def RD(N,D=3):   return np.round(N,D)        #四舍五入取3位小数 
@@ -11,41 +87,69 @@ def ABS(S):      return np.abs(S)            #返回N的绝对值
 def MAX(S1,S2):  return np.maximum(S1,S2)    #序列max
 def MIN(S1,S2):  return np.minimum(S1,S2)    #序列min
          
+@_shared
 def MA(S,N):           #求序列的N日平均值，返回序列                    
-    return pd.Series(S).rolling(N).mean().values
+    return _rolling_sum(S,N)/N
 
+@_shared
 def REF(S, N=1):       #对序列整体下移动N,返回序列(shift后会产生NAN)    
-    return pd.Series(S).shift(N).values  
+    X=_f(S);  R=np.full(X.shape,np.nan)
+    if 0<=N<len(X): R[N:]=X[:len(X)-N]
+    elif -len(X)<N<0: R[:N]=X[-N:]
+    return R
 
 def DIFF(S, N=1):      #前一个值减后一个值,前面会产生nan 
-    return pd.Series(S).diff(N)  #np.diff(S)直接删除nan，会少一行
+    return _f(S)-REF(S,N)        #np.diff(S)直接删除nan，会少一行
 
+@_shared
 def STD(S,N):           #求序列的N日标准差，返回序列    
-    return  pd.Series(S).rolling(N).std(ddof=0).values     
+    return  _rolling_apply(S,N,_std)     
 
 def IF(S_BOOL,S_TRUE,S_FALSE):          #序列布尔判断 res=S_TRUE if S_BOOL==True  else  S_FALSE
     return np.where(S_BOOL, S_TRUE, S_FALSE)
 
+@_shared
 def SUM(S, N):                          #对序列求N天累计和，返回序列         
-    return pd.Series(S).rolling(N).sum().values
+    return _rolling_sum(S,N)
 
+@_shared
 def HHV(S,N):                           # HHV(C, 5)  # 最近5天收盘最高价        
-    return pd.Series(S).rolling(N).max().values
+    return _rolling_extreme(S,N,np.maximum)
 
+@_shared
 def LLV(S,N):                           # LLV(C, 5)  # 最近5天收盘最低价     
-    return pd.Series(S).rolling(N).min().values
+    return _rolling_extreme(S,N,np.minimum)
 
+@_shared
 def EMA(S,N):         #指数移动平均,为了精度 S>4*N  EMA至少需要120周期       
-    return pd.Series(S).ewm(span=N, adjust=False).mean().values    
+    return _ewm(_f(S), alpha=2/(N+1))    
 
+@_shared
 def SMA(S, N, M=1):   #中国式的SMA,至少需要120周期才精确         
-    K = pd.Series(S).rolling(N).mean()    #先求出平均值 (下面如果有不用循环的办法，能提高性能，望告知)
-    for i in range(N+1, len(S)):  K[i] = (M * S[i] + (N -M) * K[i-1]) / N  # 因为要取K[i-1]，所以 range(N+1, len(S))        
-    return K
-
+    S=_f(S);  K=MA(S,N)                             #先求出平均值，从第N根(或第一个有效均值)起按 K[i]=(M*S[i]+(N-M)*K[i-1])/N 递推
+    V=~np.isnan(K.reshape(len(S),-1))               #递推等价于 alpha=M/N 的一阶IIR滤波，用 lfilter/ewm 在C层完成，没有Python循环
+    I=np.where(V.any(axis=0), V.argmax(axis=0), len(S))      #每列首个有效均值的位置(各股票上市日期不同)
+    I=np.maximum(N,I).reshape(S.shape[1:])          #与原循环版结果误差 < 1e-9(相对)，原版上市前有多个NaN时全为NaN，这里从首个有效均值起递推
+    if np.all(I>=len(S)): return K
+    return _sma_recursive(S, K, I, M/N)
+
+def _ewm(X, **kw):                                  #沿时间轴的 pandas ewm(adjust=False)，一维、二维通用
+    return pd.DataFrame(X.reshape(len(X),-1)).ewm(adjust=False, **kw).mean().to_numpy(copy=True).reshape(X.shape)
+
+def _sma_recursive(S, K, I, A):                     #SMA的递推内核：每列以K[I]为初值，之后 K[i]=A*S[i]+(1-A)*K[i-1]，S中出现NaN后全为NaN（与循环版一致）
+    R=np.arange(len(S)).reshape((-1,)+(1,)*(S.ndim-1))
+    J=np.minimum(I,len(S)-1);  C=np.indices(np.shape(I));  KI=K[(J,)+tuple(C)]      #各列初值
+    if _lfilter is not None:
+        X=np.where(R>I, S, 0);  X[(J,)+tuple(C)]=KI/A
+        Y=_lfilter([A],[1,A-1],X,axis=0)
+    else:
+        X=np.where(R>I, S, np.nan);  X[(J,)+tuple(C)]=KI
+        Y=_ewm(X, alpha=A);  Y[np.cumsum(np.isnan(S)&(R>I),axis=0)>0]=np.nan
+    return np.where(R>=I, Y, K)
+
+@_shared
 def AVEDEV(S,N):      #平均绝对偏差  (序列与其平均值的绝对差的平均值)   
-    avedev=pd.Series(S).rolling(N).apply(lambda x: (np.abs(x - x.mean())).mean())    
-    return avedev.values
+    return _rolling_apply(S,N,_avedev)
 
 def SLOPE(S,N,RS=False):               #返S序列N周期回线性回归斜率 (默认只返回斜率,不返回整个直线序列)
     M=pd.Series(S[-N:]);   poly = np.polyfit(M.index, M.values,deg=1);    Y=np.polyval(poly, M.index); 
@@ -0,0 +1,174 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import bar_store
+import ma_state
+
+# ----------------- 配置 -----------------
+# 读取本地K线的线程数
+LOAD_WORKERS = 8
+
+
+# ----------------- 数据 -----------------
+def load_panel(codes, start=None, end=None):
+    """从本地K线仓库（Parquet/CSV）读取多只股票的收盘价，完全离线。
+
+    每只股票占一列、按自己的K线顺序排列并靠下对齐（前面补 NaN），停牌日本来就没有K线，
+    所以滚动均线与单只股票调用 get_stock_data 时完全一致。
+    返回 (codes, closes, dates)：closes/dates 为 K线数 x 股票数 的数组，没有数据的股票被去掉。
+    """
+    def read(code):
+        df = bar_store.load(code, columns=["close"])
+        if df is None or df.empty:
+            return code, None
+        if start is not None:
+            df = df[df["trade_date"] >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df["trade_date"] <= pd.Timestamp(end)]
+        return code, df
+
+    with ThreadPoolExecutor(max_workers=LOAD_WORKERS) as pool:
+        frames = [(c, df) for c, df in pool.map(read, codes) if df is not None and not df.empty]
+    if not frames:
+        return [], np.empty((0, 0)), np.empty((0, 0), dtype="datetime64[ns]")
+    rows = max(len(df) for _, df in frames)
+    closes = np.full((rows, len(frames)), np.nan)
+    dates = np.full((rows, len(frames)), np.datetime64("NaT"), dtype="datetime64[ns]")
+    for j, (_, df) in enumerate(frames):
+        closes[rows - len(df):, j] = df["close"].to_numpy(dtype=float)
+        dates[rows - len(df):, j] = df["trade_date"].to_numpy(dtype="datetime64[ns]")
+    return [c for c, _ in frames], closes, dates
+
+
+# ----------------- 回测 -----------------
+def positions(closes, window=60):
+    """按 main() 的买入规则生成持仓（K线数 x 股票数 的布尔数组）。
+
+    买入：前一根K线不在均线之上、当前K线站上均线（均线同 ma_state.ma_above），且已有 window 根K线；
+    卖出：收盘价重新回到均线之下（含等于）。均在当根K线收盘价成交。
+    """
+    close = pd.DataFrame(closes)
+    _, above = ma_state.ma_above(close, window)
+    above = above.to_numpy() & ~np.isnan(closes)
+    ready = np.cumsum(~np.isnan(closes), axis=0) >= window
+    prev = np.vstack([np.zeros((1, closes.shape[1]), dtype=bool), above[:-1]])
+    entry = above & ~prev & ready
+    # 每段连续站上均线的区间，只有起点是买入信号时才持有整段
+    start = above & ~prev
+    held = pd.DataFrame(np.where(start, entry, np.nan)).ffill().to_numpy() == 1
+    return above & held
+
+
+def trades(codes, closes, dates, pos):
+    """把持仓数组拆成逐笔交易表（全部为数组运算，不逐日循环）"""
+    rows, cols = pos.shape
+    # 按“股票优先、时间其次”展开，在前后各补一根空仓，买入/卖出点成对出现
+    p = np.vstack([np.zeros((1, cols), dtype=bool), pos, np.zeros((1, cols), dtype=bool)]).T.astype(np.int8)
+    d = np.diff(p, axis=1)
+    ej, et = np.nonzero(d == 1)    # 买入：第 et 根K线收盘
+    xj, xt = np.nonzero(d == -1)   # 卖出：第 xt 根K线收盘（xt == rows 表示到最后仍持有）
+    is_open = xt >= rows
+    xt = np.minimum(xt, rows - 1)
+    entry_px, exit_px = closes[et, ej], closes[xt, xj]
+    return pd.DataFrame({
+        "code": np.asarray(codes, dtype=object)[ej] if len(ej) else [],
+        "entry_date": dates[et, ej],
+        "exit_date": dates[xt, xj],
+        "entry_price": entry_px,
+        "exit_price": exit_px,
+        "return_pct": (exit_px / entry_px - 1) * 100,
+        "bars_held": xt - et,
+        "open": is_open,
+    })
+
+
+def run(codes, closes, dates, window=60):
+    """回测 MA 站上/跌破规则，返回 (每只股票的统计表, 逐笔交易表)"""
+    pos = positions(closes, window)
+    ret = np.nan_to_num(closes[1:] / closes[:-1] - 1)
+    strat = np.vstack([np.zeros((1, closes.shape[1])), pos[:-1] * ret])
+    equity = np.cumprod(1 + strat, axis=0)
+    drawdown = equity / np.maximum.accumulate(equity, axis=0) - 1
+
+    first = np.argmax(~np.isnan(closes), axis=0)
+    cols = np.arange(closes.shape[1])
+    tr = trades(codes, closes, dates, pos)
+    by_code = tr.groupby("code")
+    summary = pd.DataFrame({
+        "code": codes,
+        "bars": (~np.isnan(closes)).sum(axis=0),
+        "total_return_pct": (equity[-1] - 1) * 100,
+        "buy_hold_pct": (closes[-1] / closes[first, cols] - 1) * 100,
+        "max_drawdown_pct": drawdown.min(axis=0) * 100,
+        "exposure_pct": pos.sum(axis=0) / np.maximum((~np.isnan(closes)).sum(axis=0), 1) * 100,
+    }).set_index("code")
+    summary["trades"] = by_code.size()
+    summary["win_rate_pct"] = by_code["return_pct"].apply(lambda r: (r > 0).mean() * 100)
+    summary["avg_return_pct"] = by_code["return_pct"].mean()
+    summary["avg_bars_held"] = by_code["bars_held"].mean()
+    summary["trades"] = summary["trades"].fillna(0).astype(int)
+    return summary.reset_index(), tr
+
+
+# ----------------- 参数扫描 -----------------
+_panel = None
+
+
+def _init_worker(codes, closes, dates):
+    """进程池初始化：每个进程只接收一次K线数据"""
+    global _panel
+    _panel = (codes, closes, dates)
+
+
+def _sweep_one(window):
+    summary, tr = run(*_panel, window=window)
+    return {
+        "window": window,
+        "trades": int(summary["trades"].sum()),
+        "win_rate_pct": float((tr["return_pct"] > 0).mean() * 100) if len(tr) else np.nan,
+        "avg_trade_pct": float(tr["return_pct"].mean()) if len(tr) else np.nan,
+        "avg_bars_held": float(tr["bars_held"].mean()) if len(tr) else np.nan,
+        "mean_total_return_pct": float(summary["total_return_pct"].mean()),
+        "median_total_return_pct": float(summary["total_return_pct"].median()),
+        "mean_max_drawdown_pct": float(summary["max_drawdown_pct"].mean()),
+    }
+
+
+def sweep(codes, closes, dates, windows=range(20, 251, 10), workers=None):
+    """多个均线周期并行回测（每个周期一个任务，分布在多个 CPU 核上），返回按周期排列的汇总表"""
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(codes, closes, dates)) as pool:
+        rows = list(pool.map(_sweep_one, windows))
+    return pd.DataFrame(rows)
+
+
+# ----------------- 执行 -----------------
+if __name__ == "__main__":
+    import screener
+
+    parser = argparse.ArgumentParser(description="均线买入规则回测（使用本地K线仓库，离线运行）")
+    parser.add_argument("--universe", help="股票池 CSV（code,name），省略时使用本地K线仓库中的全部股票")
+    parser.add_argument("--start", help="开始日期，如 2015-01-01")
+    parser.add_argument("--end", help="结束日期")
+    parser.add_argument("--window", type=int, default=60, help="均线周期")
+    parser.add_argument("--sweep", metavar="START:STOP:STEP", help="参数扫描均线周期，如 20:250:10")
+    parser.add_argument("--workers", type=int, help="参数扫描的进程数，默认 CPU 核数")
+    parser.add_argument("--output", help="结果另存为 CSV")
+    args = parser.parse_args()
+
+    stocks = screener.load_universe(args.universe)
+    codes, closes, dates = load_panel([s["code"] for s in stocks], args.start, args.end)
+    print(f"已加载 {len(codes)} 只股票，最长 {closes.shape[0]} 根K线")
+    if args.sweep:
+        a, b, c = (int(x) for x in args.sweep.split(":"))
+        result = sweep(codes, closes, dates, range(a, b + 1, c), args.workers)
+    else:
+        result, _ = run(codes, closes, dates, args.window)
+    print(result.to_string(index=False, float_format=lambda x: f"{x:.2f}"))
+    if args.output:
+        result.to_csv(args.output, index=False, encoding="utf-8-sig")
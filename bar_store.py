@@ -0,0 +1,128 @@
+import os
+import tempfile
+
+import pandas as pd
+
+# ----------------- 配置 -----------------
+# 本地K线仓库目录，每个 (代码, 周期, 复权方式) 一个列式文件
+BAR_STORE_DIR = os.getenv("BAR_STORE_DIR", os.path.join("data", "bars"))
+# 增量获取时与已存数据重叠的K线根数，用于检测前复权因子是否变化
+OVERLAP_BARS = 5
+# 重叠K线收盘价允许的误差，超过即认为发生了除权除息，需要重建历史
+ADJUST_TOLERANCE = 0.005
+
+try:
+    import pyarrow  # noqa: F401  Parquet 读写依赖
+    FILE_FORMAT = "parquet"
+except ImportError:
+    FILE_FORMAT = "csv"  # 没有 pyarrow 时退回 CSV，功能相同，只是体积和速度差一些
+
+
+# ----------------- 函数 -----------------
+def bar_path(code, k_type=1, adjust_type=1):
+    """K线文件路径"""
+    return os.path.join(BAR_STORE_DIR, f"{code}_k{k_type}_adj{adjust_type}.{FILE_FORMAT}")
+
+
+def list_codes(k_type=1, adjust_type=1):
+    """仓库中已有数据的股票代码"""
+    if not os.path.isdir(BAR_STORE_DIR):
+        return []
+    suffix = f"_k{k_type}_adj{adjust_type}.{FILE_FORMAT}"
+    return sorted(f[:-len(suffix)] for f in os.listdir(BAR_STORE_DIR) if f.endswith(suffix))
+
+
+def load(code, k_type=1, adjust_type=1, columns=None):
+    """读取本地K线，不存在返回 None；columns 指定只读取的列（总会包含 trade_date）"""
+    path = bar_path(code, k_type, adjust_type)
+    if not os.path.exists(path):
+        return None
+    if columns is not None:
+        columns = ["trade_date"] + [c for c in columns if c != "trade_date"]
+    if FILE_FORMAT == "parquet":
+        df = pd.read_parquet(path, columns=columns)
+    else:
+        df = pd.read_csv(path, dtype={"stock_code": str}, usecols=columns)
+    df["trade_date"] = pd.to_datetime(df["trade_date"])
+    return df
+
+
+def save(df, code, k_type=1, adjust_type=1):
+    """原子写入本地K线（先写临时文件再替换）。
+    临时文件名唯一：获取超时重试时，超时的线程可能仍在写同一只股票。"""
+    path = bar_path(code, k_type, adjust_type)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + ".", suffix=".tmp")
+    os.close(fd)
+    try:
+        if FILE_FORMAT == "parquet":
+            df.to_parquet(tmp, index=False)
+        else:
+            df.to_csv(tmp, index=False)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def fetch_adata(code, start_date="1990-01-01", k_type=1, adjust_type=1):
+    """从 adata 获取 start_date 之后（含）的K线"""
+    import adata
+    df = adata.stock.market.get_market(
+        stock_code=code,
+        start_date=start_date,
+        k_type=k_type,
+        adjust_type=adjust_type,
+    )
+    if df is None or df.empty:
+        return None
+    df = df.copy()
+    df["trade_date"] = pd.to_datetime(df["trade_date"])
+    return df.sort_values("trade_date").reset_index(drop=True)
+
+
+def _adjust_changed(old, new):
+    """比较重叠区间的收盘价，判断前复权价格是否整体变动（新的除权除息）。
+
+    最后一根已存K线可能是盘中未收盘的数据，不参与比较。
+    """
+    last_date = old["trade_date"].iloc[-1]
+    merged = old[old["trade_date"] < last_date][["trade_date", "close"]].merge(
+        new[["trade_date", "close"]], on="trade_date", suffixes=("_old", "_new")
+    )
+    if merged.empty:
+        return False
+    diff = (merged["close_old"].astype(float) - merged["close_new"].astype(float)).abs()
+    return bool((diff > ADJUST_TOLERANCE).any())
+
+
+def update(code, k_type=1, adjust_type=1, fetch=fetch_adata):
+    """增量更新并返回某只股票的全部K线。
+
+    只向数据源请求最后几根已存K线之后的数据，追加到本地文件；
+    如果重叠部分的价格对不上（前复权因子变化），重新下载完整历史。
+    """
+    old = load(code, k_type, adjust_type)
+    if old is None or old.empty:
+        df = fetch(code, k_type=k_type, adjust_type=adjust_type)
+        if df is not None:
+            save(df, code, k_type, adjust_type)
+        return df
+
+    start = old["trade_date"].iloc[-min(OVERLAP_BARS, len(old))]
+    new = fetch(code, start_date=start.strftime("%Y-%m-%d"), k_type=k_type, adjust_type=adjust_type)
+    if new is None or new.empty:
+        return old
+
+    if _adjust_changed(old, new):
+        print(f"{code} 前复权价格发生变化（除权除息），重建历史数据")
+        df = fetch(code, k_type=k_type, adjust_type=adjust_type)
+        if df is None:
+            return old
+    else:
+        # 用新数据覆盖重叠部分（最后一根可能是盘中数据），再追加新K线
+        first_new = new["trade_date"].iloc[0]
+        df = pd.concat([old[old["trade_date"] < first_new], new], ignore_index=True)
+
+    save(df, code, k_type, adjust_type)
+    return df
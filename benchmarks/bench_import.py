@@ -0,0 +1,93 @@
+"""main.py 启动耗时基准：用 python -X importtime 统计导入 main 并判断交易日的耗时，超出预算时以非零状态退出。
+
+用法：python benchmarks/bench_import.py [--budget-ms 60] [--repeat 5] [--top 15]
+同时检查启动阶段没有导入 pandas / matplotlib / adata / exchange_calendars 等较重的模块
+（它们应在确实需要时才在函数内导入）。第一次运行前会先预热一次，生成本地交易日历缓存。
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# ----------------- 配置 -----------------
+# 启动阶段不允许出现的模块（按顶层包名）
+HEAVY = ("pandas", "numpy", "matplotlib", "adata", "exchange_calendars", "requests", "scipy", "pyarrow")
+# 被测的启动路径：导入 main 并判断今天是否交易日（非交易日的运行到此为止）
+STARTUP = "import main; main.is_trade_day()"
+
+
+# ----------------- 函数 -----------------
+def _python(code, importtime=False):
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "启动失败")
+    return proc
+
+
+def parse_importtime(stderr):
+    """解析 -X importtime 输出，返回 [(模块名, 自身us, 累计us, 层级)]"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), int(self_us), int(cum_us), depth))
+    return rows
+
+
+def measure():
+    """一次启动：返回 (解释器初始化之后全部导入的耗时 ms, 这部分的导入记录)"""
+    rows = parse_importtime(_python(STARTUP, importtime=True).stderr)
+    # 解释器自身的初始化导入以顶层的 site 结束，之后才是被测代码触发的导入
+    start = max((i + 1 for i, r in enumerate(rows) if r[0] == "site" and r[3] == 0), default=0)
+    rows = rows[start:]
+    total = sum(cum for _, _, cum, depth in rows if depth == 0)
+    return total / 1000, rows
+
+
+def heavy_modules():
+    """启动路径执行后已加载的较重模块"""
+    code = STARTUP + "; import sys; print(' '.join(sorted({m.split('.')[0] for m in sys.modules})))"
+    loaded = set(_python(code).stdout.split())
+    return sorted(loaded & set(HEAVY))
+
+
+def run(budget_ms=60.0, repeat=5, top=15):
+    _python(STARTUP)   # 预热：生成交易日历缓存、.pyc
+    times, rows = [], None
+    for _ in range(repeat):
+        ms, rows = measure()
+        times.append(ms)
+    median = statistics.median(times)
+
+    print(f"启动路径：{STARTUP}")
+    print(f"启动导入耗时：中位数 {median:.1f}ms（{repeat} 次：{', '.join(f'{t:.1f}' for t in times)}），预算 {budget_ms:.0f}ms")
+    print(f"最慢的 {top} 个模块（累计耗时）：")
+    for name, self_us, cum_us, depth in sorted(rows, key=lambda r: -r[2])[:top]:
+        print(f"  {cum_us / 1000:8.2f}ms  {self_us / 1000:8.2f}ms  {'  ' * depth}{name}")
+
+    ok = True
+    heavy = heavy_modules()
+    if heavy:
+        print(f"❌ 启动阶段导入了较重的模块：{', '.join(heavy)}")
+        ok = False
+    if median > budget_ms:
+        print(f"❌ 启动耗时 {median:.1f}ms 超出预算 {budget_ms:.0f}ms")
+        ok = False
+    if ok:
+        print("✅ 启动耗时在预算内")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=60.0, help="启动导入耗时预算（毫秒）")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数，取中位数")
+    parser.add_argument("--top", type=int, default=15, help="列出最慢的模块数")
+    args = parser.parse_args()
+    sys.exit(0 if run(args.budget_ms, args.repeat, args.top) else 1)
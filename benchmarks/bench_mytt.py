@@ -0,0 +1,224 @@
+"""MyTT 指标性能基准：新实现 vs 原实现（参考实现保留在本文件中），同时核对结果误差。
+
+用法：python benchmarks/bench_mytt.py [--sizes 10000,100000,1000000] [--ref-max 100000] [--batch 5000x250] [--plan 100000]
+原实现是逐元素的 Python 循环，超过 --ref-max 的规模只测新实现。
+--batch 比较宽表（股票数x K线数）一次批量计算与逐只股票循环调用的耗时。
+--plan 比较用 IndicatorPlan 一次算 20 个指标与逐个调用的耗时，并输出复用统计。
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import MyTT  # noqa: E402
+from indicator_plan import FIELDS, IndicatorPlan  # noqa: E402
+
+# 与参考实现比较的允许相对误差
+RTOL = 1e-9
+
+
+# ----------------- 原实现（参考） -----------------
+def ref_SMA(S, N, M=1):
+    K = pd.Series(S).rolling(N).mean()
+    for i in range(N + 1, len(S)):
+        K[i] = (M * S[i] + (N - M) * K[i - 1]) / N
+    return K.values
+
+
+def ref_RSI(CLOSE, N=24):
+    DIF = CLOSE - MyTT.REF(CLOSE, 1)
+    return MyTT.RD(ref_SMA(MyTT.MAX(DIF, 0), N) / ref_SMA(MyTT.ABS(DIF), N) * 100)
+
+
+def ref_MA(S, N):
+    return pd.Series(S).rolling(N).mean().values
+
+
+def ref_EMV(HIGH, LOW, VOL, N=14, M=9):
+    VOLUME = ref_MA(VOL, N) / VOL
+    MID = 100 * (HIGH + LOW - MyTT.REF(HIGH + LOW, 1)) / (HIGH + LOW)
+    EMV = ref_MA(MID * VOLUME * (HIGH - LOW) / ref_MA(HIGH - LOW, N), N)
+    return EMV, ref_MA(EMV, M)
+
+
+def ref_HHV(S, N):
+    return pd.Series(S).rolling(N).max().values
+
+
+def ref_LLV(S, N):
+    return pd.Series(S).rolling(N).min().values
+
+
+def ref_AVEDEV(S, N):
+    return pd.Series(S).rolling(N).apply(lambda x: (np.abs(x - x.mean())).mean()).values
+
+
+def ref_CCI(CLOSE, HIGH, LOW, N=14):
+    TP = (HIGH + LOW + CLOSE) / 3
+    return (TP - ref_MA(TP, N)) / (0.015 * ref_AVEDEV(TP, N))
+
+
+def ref_KDJ(CLOSE, HIGH, LOW, N=9, M1=3, M2=3):
+    RSV = (CLOSE - ref_LLV(LOW, N)) / (ref_HHV(HIGH, N) - ref_LLV(LOW, N)) * 100
+    K = MyTT.EMA(RSV, (M1 * 2 - 1))
+    D = MyTT.EMA(K, (M2 * 2 - 1))
+    return K * 3 - D * 2
+
+
+def ref_WR(CLOSE, HIGH, LOW, N=10):
+    return MyTT.RD((ref_HHV(HIGH, N) - CLOSE) / (ref_HHV(HIGH, N) - ref_LLV(LOW, N)) * 100)
+
+
+# 名称 -> (新实现, 参考实现)，多返回值的指标取最能覆盖计算路径的一条线
+CASES = {
+    "SMA(C,24)": (lambda d: MyTT.SMA(d["close"], 24), lambda d: ref_SMA(d["close"], 24)),
+    "RSI(C,24)": (lambda d: MyTT.RSI(d["close"], 24), lambda d: ref_RSI(d["close"], 24)),
+    "CCI(14)": (lambda d: MyTT.CCI(d["close"], d["high"], d["low"], 14),
+                lambda d: ref_CCI(d["close"], d["high"], d["low"], 14)),
+    "KDJ.J(9)": (lambda d: MyTT.KDJ(d["close"], d["high"], d["low"])[2],
+                 lambda d: ref_KDJ(d["close"], d["high"], d["low"])),
+    "WR(10)": (lambda d: MyTT.WR(d["close"], d["high"], d["low"])[0],
+               lambda d: ref_WR(d["close"], d["high"], d["low"])),
+    # 含 NaN/±inf 的序列、成交量为0的K线（VOL 作除数得到 inf）：窗口移出后应恢复为有效值
+    "MA(C!,5)": (lambda d: MyTT.MA(d["close!"], 5), lambda d: ref_MA(d["close!"], 5)),
+    "EMV(V=0)": (lambda d: MyTT.EMV(d["high"], d["low"], d["volume!"])[1],
+                 lambda d: ref_EMV(d["high"], d["low"], d["volume!"])[1]),
+}
+
+
+# ----------------- 函数 -----------------
+def make_ohlcv(n, seed=0):
+    """生成 n 根随机游走的合成K线"""
+    rng = np.random.default_rng(seed)
+    close = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    spread = np.abs(rng.normal(0, 0.01, n)) * close
+    return {
+        "open": close + rng.normal(0, 0.005, n) * close,
+        "high": close + spread,
+        "low": close - spread,
+        "close": close,
+        "volume": rng.integers(1_000, 1_000_000, n).astype(float),
+    }
+
+
+def with_bad_values(data):
+    """加入异常值的序列：close! 含 NaN/+inf/-inf，volume! 含成交量为0的K线"""
+    n = len(data["close"])
+    close, volume = data["close"].copy(), data["volume"].copy()
+    close[n // 10::n // 3 or 1] = np.inf
+    close[n // 5::n // 3 or 1] = -np.inf
+    close[n // 4] = np.nan
+    volume[n // 7::n // 4 or 1] = 0
+    return {**data, "close!": close, "volume!": volume}
+
+
+def timeit(fn, *args, repeat=3):
+    """返回 (最快耗时秒, 结果)"""
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        out = fn(*args)
+        best = min(best, time.perf_counter() - t)
+    return best, out
+
+
+def max_rel_err(a, b):
+    a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+    mask = np.isfinite(a)
+    if not np.array_equal(mask, np.isfinite(b)) or not np.array_equal(a[~mask], b[~mask], equal_nan=True):
+        return float("inf")
+    if not mask.any():
+        return 0.0
+    return float(np.max(np.abs(a[mask] - b[mask]) / np.maximum(np.abs(b[mask]), 1e-12)))
+
+
+@np.errstate(divide="ignore", invalid="ignore")   # 成交量为0时的除零
+def run(sizes, ref_max):
+    print(f"{'case':<12}{'bars':>10}{'new(ms)':>12}{'ref(ms)':>12}{'speedup':>10}{'max_rel_err':>14}")
+    ok = True
+    for n in sizes:
+        data = with_bad_values(make_ohlcv(n))
+        for name, (new, ref) in CASES.items():
+            t_new, out = timeit(new, data)
+            if n <= ref_max:
+                t_ref, expected = timeit(ref, data, repeat=1)
+                err = max_rel_err(out, expected)
+                # RSI/WR 结果保留3位小数，四舍五入边界上允许 0.001 的差
+                ok &= err <= RTOL or np.nanmax(np.abs(out - expected)) <= 1e-3 + 1e-12
+                ref_col, speed_col, err_col = f"{t_ref * 1e3:.1f}", f"{t_ref / t_new:.0f}x", f"{err:.1e}"
+            else:
+                ref_col = speed_col = err_col = "-"
+            print(f"{name:<12}{n:>10}{t_new * 1e3:>12.2f}{ref_col:>12}{speed_col:>10}{err_col:>14}")
+    return ok
+
+
+# 批量模式：名称 -> 对一组K线的调用，一维、二维输入通用
+BATCH_CASES = {
+    "MA(C,60)": lambda c: MyTT.MA(c, 60),
+    "BOLL(C,20)": lambda c: MyTT.BOLL(c, 20),
+    "MACD(C)": lambda c: MyTT.MACD(c),
+    "RSI(C,24)": lambda c: MyTT.RSI(c, 24),
+}
+
+
+def run_batch(symbols, bars):
+    """宽表一次计算 vs 逐列循环，并核对结果一致"""
+    rng = np.random.default_rng(1)
+    close = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, (bars, symbols)), axis=0))
+    # 模拟不同的上市日期：每列前面随机一段为 NaN
+    listed = rng.integers(0, bars // 2, symbols)
+    close[np.arange(bars)[:, None] < listed] = np.nan
+    print(f"\nbatch {symbols} symbols x {bars} bars")
+    print(f"{'case':<12}{'2-D(ms)':>12}{'loop(ms)':>12}{'speedup':>10}")
+    ok = True
+    for name, fn in BATCH_CASES.items():
+        t_2d, wide = timeit(fn, close, repeat=1)
+        t_loop, cols = timeit(lambda c: [fn(c[:, j]) for j in range(c.shape[1])], close, repeat=1)
+        wide = wide if isinstance(wide, tuple) else (wide,)
+        for j, col in enumerate(cols):
+            col = col if isinstance(col, tuple) else (col,)
+            ok &= all(np.allclose(np.asarray(w)[:, j], c, equal_nan=True) for w, c in zip(wide, col))
+        print(f"{name:<12}{t_2d * 1e3:>12.1f}{t_loop * 1e3:>12.1f}{t_loop / t_2d:>9.0f}x")
+    return ok
+
+
+PLAN_SPECS = [
+    "MACD", "KDJ", "RSI", "WR", "BIAS", "BOLL", "PSY", "CCI", "ATR", "BBI",
+    "DMI", ("TAQ", {"N": 20}), "TRIX", "VR", "EMV", "DPO", "BRAR", "DMA", "MTM", "ROC",
+]
+
+
+def run_plan(bars):
+    """IndicatorPlan 一次计算 vs 逐个指标单独计算"""
+    data = make_ohlcv(bars)
+    plan = IndicatorPlan(PLAN_SPECS)
+
+    def separate():
+        return [func(*[data[FIELDS[f]] for f in inputs], **params)
+                for _, func, inputs, params, _ in plan.items]
+
+    t_sep, _ = timeit(separate)
+    t_plan, _ = timeit(plan.run, data)
+    print(f"\nplan {len(PLAN_SPECS)} indicators x {bars} bars: separate {t_sep * 1e3:.1f}ms, plan {t_plan * 1e3:.1f}ms")
+    print(plan.format_report())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--ref-max", type=int, default=100000)
+    parser.add_argument("--batch", default="", help="股票数x K线数，如 5000x250")
+    parser.add_argument("--plan", type=int, default=0, help="IndicatorPlan 测试的K线数")
+    args = parser.parse_args()
+    sizes = [int(x) for x in args.sizes.split(",")]
+    ok = run(sizes, args.ref_max)
+    if args.batch:
+        symbols, bars = (int(x) for x in args.batch.lower().split("x"))
+        ok &= run_batch(symbols, bars)
+    if args.plan:
+        run_plan(args.plan)
+    sys.exit(0 if ok else 1)
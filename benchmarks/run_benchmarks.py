@@ -0,0 +1,302 @@
+"""基准测试套件：MyTT 全部二级指标、批量宽表计算、Ashare 解析、离线端到端 main()，结果保存为 JSON 便于前后对比。
+
+用法：
+    python benchmarks/run_benchmarks.py                         # 全部套件，结果写入 benchmarks/results/
+    python benchmarks/run_benchmarks.py --quick                 # 小规模快速跑一遍
+    python benchmarks/run_benchmarks.py --suite mytt,ashare --bars 1000,100000
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/<旧结果>.json --threshold 1.25
+
+合成数据为固定随机种子的随机游走K线，结果可复现。每个用例取多次运行的最快值（同时记录中位数）；
+--compare 时对同名用例计算耗时比值，超过阈值的视为性能回退，以非零状态退出。
+"""
+import argparse
+import contextlib
+import inspect
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+import MyTT  # noqa: E402
+from bench_mytt import make_ohlcv  # noqa: E402
+from indicator_plan import FIELDS, IndicatorPlan  # noqa: E402
+
+# ----------------- 配置 -----------------
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+BARS = [1_000, 100_000, 1_000_000]
+SYMBOLS = [1, 100, 5_000]
+# 批量套件跳过 K线数 x 股票数 超过此值的组合（全部指标结果都留在内存里，1000 万格约需 6GB 以上）
+MAX_CELLS = 5_000_000
+# 每个用例至少运行 MIN_REPEAT 次，累计超过 MIN_TIME 秒或达到 MAX_REPEAT 次为止
+MIN_REPEAT = 3
+MAX_REPEAT = 20
+MIN_TIME = 0.5
+# 端到端套件的股票数
+E2E_SYMBOLS = [6, 100]
+# 没有默认值的指标参数
+INDICATOR_PARAMS = {"TAQ": {"N": 20}}
+
+
+# ----------------- 计时 -----------------
+def measure(fn, min_repeat=MIN_REPEAT, max_repeat=MAX_REPEAT, min_time=MIN_TIME):
+    """多次运行 fn，返回耗时统计（毫秒）"""
+    times = []
+    start = time.perf_counter()
+    while len(times) < min_repeat or (len(times) < max_repeat and time.perf_counter() - start < min_time):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return {
+        "best_ms": round(min(times) * 1e3, 4),
+        "median_ms": round(statistics.median(times) * 1e3, 4),
+        "repeat": len(times),
+    }
+
+
+def level2_indicators():
+    """MyTT 的全部二级指标（第一个参数是 CLOSE/HIGH/LOW/OPEN/VOL 的函数）"""
+    names = []
+    for name, func in inspect.getmembers(MyTT, inspect.isfunction):
+        params = list(inspect.signature(func).parameters)
+        if name.isupper() and params and params[0] in FIELDS:
+            names.append(name)
+    return names
+
+
+# ----------------- 套件 -----------------
+def suite_mytt(bars, symbols):
+    """单只股票：每个二级指标在不同K线数上的耗时"""
+    for n in bars:
+        data = make_ohlcv(n)
+        for name in level2_indicators():
+            func = getattr(MyTT, name)
+            inputs = [data[FIELDS[p]] for p in inspect.signature(func).parameters if p in FIELDS]
+            params = INDICATOR_PARAMS.get(name, {})
+            yield f"mytt.{name}", {"bars": n}, lambda: func(*inputs, **params)
+
+
+def _wide(symbols, bars, seed=1):
+    """股票数 x K线数 的宽表（行=日期，列=股票），各列上市日期不同（前面一段为 NaN）"""
+    rng = np.random.default_rng(seed)
+    close = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, (bars, symbols)), axis=0))
+    spread = np.abs(rng.normal(0, 0.01, (bars, symbols))) * close
+    listed = rng.integers(0, max(bars // 2, 1), symbols) if symbols > 1 else np.zeros(1, dtype=int)
+    frame = {
+        "open": close + rng.normal(0, 0.005, (bars, symbols)) * close,
+        "high": close + spread,
+        "low": close - spread,
+        "close": close,
+        "volume": rng.integers(1_000, 1_000_000, (bars, symbols)).astype(float),
+    }
+    mask = np.arange(bars)[:, None] < listed
+    for v in frame.values():
+        v[mask] = np.nan
+    return frame
+
+
+def suite_batch(bars, symbols):
+    """多只股票：IndicatorPlan 在宽表上一次计算全部二级指标"""
+    specs = [(name, INDICATOR_PARAMS[name]) if name in INDICATOR_PARAMS else name for name in level2_indicators()]
+    for n in bars:
+        for m in symbols:
+            if n * m > MAX_CELLS:
+                continue
+            frame = _wide(m, n)
+            plan = IndicatorPlan(specs)
+            yield "batch.plan_all", {"bars": n, "symbols": m, "indicators": len(specs)}, lambda: plan.run(frame)
+
+
+def suite_ashare(bars, symbols):
+    """Ashare 解析路径（benchmarks/fixtures 下的接口响应样本）"""
+    import bench_ashare_parse as bap
+    for name, (fixture, new, _) in bap.CASES.items():
+        content = bap.load_fixture(fixture)
+        yield f"ashare.{name.replace(' ', '_')}", {"bytes": len(content)}, lambda: new(content)
+
+
+class FakeNotifier:
+    """代替 notifier.Notifier：只记录消息，不连接 SMTP"""
+    outbox = []
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def add(self, message, image_path=None, on_sent=None):
+        FakeNotifier.outbox.append((message, image_path))
+        if on_sent is not None:
+            on_sent()
+        return True
+
+    def close(self, timeout=None):
+        return True
+
+
+def _fake_bars(code, n=250, cross=False):
+    """合成日K线；cross=True 时最后一根新站上60日线"""
+    rng = np.random.default_rng(int(code))
+    close = 10 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    ma = pd.Series(close).rolling(60).mean().to_numpy()
+    mid = pd.Series(close).rolling(20).mean().to_numpy()
+    if cross:
+        close[-2] = min(close[-2], ma[-2] * 0.99)
+        close[-1] = ma[-2] * 1.05
+    else:   # 收在60日线和布林中轨之下，两条规则都不触发
+        close[-1] = min(close[-1], ma[-1] * 0.97, mid[-1] * 0.97)
+    return pd.DataFrame({
+        "trade_date": pd.bdate_range(end="2024-06-28", periods=n),
+        "open": close, "high": close * 1.01, "low": close * 0.99, "close": close,
+        "volume": rng.integers(1_000, 1_000_000, n).astype(float),
+    })
+
+
+def suite_e2e(bars, symbols):
+    """离线端到端 main()：合成K线、强制交易日、假的邮件后端，每次在全新的临时目录里运行（含画图）。
+    main() 的打印输出和画图时缺中文字体的警告不计入结果显示。"""
+    import main
+    import notifier
+    import trade_calendar
+
+    warnings.simplefilter("ignore")
+    os.environ["PYTHONWARNINGS"] = "ignore"   # 画图进程池的子进程
+    for m in E2E_SYMBOLS:
+        stocks = [{"code": f"{600000 + i:06d}", "name": f"S{i}"} for i in range(m)]
+        crossing = {s["code"] for s in stocks[:max(1, m // 20)]}   # 约 5% 的股票触发信号
+        cache = {s["code"]: _fake_bars(s["code"], cross=s["code"] in crossing) for s in stocks}
+
+        def run_main(stocks=stocks, cache=cache):
+            work = tempfile.mkdtemp(prefix="bench_e2e_")
+            cwd = os.getcwd()
+            saved = (main.STOCK_LIST, main.load_bars, main.is_trade_day, notifier.Notifier, trade_calendar.today)
+            try:
+                os.chdir(work)   # 状态、台账、图表都写在临时目录（相对路径 data/...）
+                main.STOCK_LIST = stocks
+                main.load_bars = lambda code: cache[code].copy()
+                main.is_trade_day = lambda: True
+                trade_calendar.today = lambda: pd.Timestamp("2024-06-28").date()
+                notifier.Notifier = FakeNotifier
+                FakeNotifier.outbox = []
+                with contextlib.redirect_stdout(io.StringIO()):
+                    main.main()
+                assert len(FakeNotifier.outbox) == len(crossing), "信号数与预期不符"
+            finally:
+                main.STOCK_LIST, main.load_bars, main.is_trade_day, notifier.Notifier, trade_calendar.today = saved
+                os.chdir(cwd)
+                shutil.rmtree(work, ignore_errors=True)
+
+        yield "e2e.main", {"symbols": m, "signals": len(crossing)}, run_main
+
+
+SUITES = {
+    "mytt": suite_mytt,
+    "batch": suite_batch,
+    "ashare": suite_ashare,
+    "e2e": suite_e2e,
+}
+
+
+# ----------------- 运行与对比 -----------------
+def _key(rec):
+    return rec["case"] + json.dumps(rec["params"], sort_keys=True)
+
+
+def metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run(suites, bars, symbols):
+    results = []
+    for suite in suites:
+        print(f"\n== {suite} ==")
+        for case, params, fn in SUITES[suite](bars, symbols):
+            # e2e 每次都要建临时目录、渲染图表，只跑 MIN_REPEAT 次
+            with np.errstate(divide="ignore", invalid="ignore"):   # 合成数据里的 0/0（如 VR）
+                stats = measure(fn, max_repeat=MIN_REPEAT) if suite == "e2e" else measure(fn)
+            rec = {"suite": suite, "case": case, "params": params, **stats}
+            results.append(rec)
+            desc = " ".join(f"{k}={v}" for k, v in params.items())
+            print(f"{case:<24}{desc:<36}{stats['best_ms']:>12.3f}ms  (median {stats['median_ms']:.3f}ms, x{stats['repeat']})")
+    return results
+
+
+def compare(results, baseline_path, threshold):
+    """与旧结果对比，返回回退的用例数"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {_key(r): r for r in json.load(f)["results"]}
+    print(f"\n== 对比 {baseline_path}（阈值 {threshold:.2f}x） ==")
+    regressions = 0
+    for rec in results:
+        old = baseline.get(_key(rec))
+        if old is None:
+            continue
+        ratio = rec["best_ms"] / max(old["best_ms"], 1e-9)
+        flag = "❌ 回退" if ratio > threshold else ("✅ 提升" if ratio < 1 / threshold else "")
+        regressions += ratio > threshold
+        desc = " ".join(f"{k}={v}" for k, v in rec["params"].items())
+        print(f"{rec['case']:<24}{desc:<36}{old['best_ms']:>12.3f} -> {rec['best_ms']:>10.3f}ms  {ratio:>6.2f}x  {flag}")
+    return regressions
+
+
+def save(results, path=None):
+    meta = metadata()
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(RESULTS_DIR, f"{stamp}-{meta['commit'] or 'nogit'}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "results": results}, f, ensure_ascii=False, indent=1)
+    print(f"\n结果已保存到 {path}")
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--suite", default=",".join(SUITES), help=f"逗号分隔，可选 {','.join(SUITES)}")
+    parser.add_argument("--bars", default=",".join(map(str, BARS)), help="K线数")
+    parser.add_argument("--symbols", default=",".join(map(str, SYMBOLS)), help="批量套件的股票数")
+    parser.add_argument("--quick", action="store_true", help="小规模：--bars 1000,100000 --symbols 1,100")
+    parser.add_argument("--output", help="结果文件路径，默认 benchmarks/results/<时间>-<提交>.json")
+    parser.add_argument("--no-save", action="store_true", help="不保存结果")
+    parser.add_argument("--compare", metavar="JSON", help="与之前保存的结果对比")
+    parser.add_argument("--threshold", type=float, default=1.25, help="耗时比值超过该值视为回退")
+    args = parser.parse_args()
+
+    bars = [1_000, 100_000] if args.quick else [int(x) for x in args.bars.split(",")]
+    symbols = [1, 100] if args.quick else [int(x) for x in args.symbols.split(",")]
+    suites = [s.strip() for s in args.suite.split(",") if s.strip()]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        parser.error(f"未知套件 {sorted(unknown)}")
+
+    results = run(suites, bars, symbols)
+    if not args.no_save:
+        save(results, args.output)
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
@@ -1,45 +1,24 @@
-import smtplib
-import os
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.application import MIMEApplication
+from strategy_engine import register
+# 邮件发送与 main.py 共用 utils_email / notifier 的实现（连接复用、自动选择可用的连接方式）
+from utils_email import send_email_if_signal  # noqa: F401
 
-def send_email_if_signal(message, image_path=None):
-    sender = os.getenv("QQ_EMAIL")
-    password = os.getenv("AUTH_CODE")
-    receiver = os.getenv("RECEIVER")
+# ----------------- 配置 -----------------
+BOLL_N = 20
+BOLL_P = 2
 
-    print(f"邮件配置检查 - 发件人: {sender}, 收件人: {receiver}")
 
-    if not sender or not password or not receiver:
-        print("❌ 缺少邮件环境变量（QQ_EMAIL / AUTH_CODE / RECEIVER）")
-        print(f"当前环境变量 - QQ_EMAIL: {'已设置' if sender else '未设置'}, AUTH_CODE: {'已设置' if password else '未设置'}, RECEIVER: {'已设置' if receiver else '未设置'}")
-        return False
-
-    msg = MIMEMultipart()
-    msg["From"] = sender
-    msg["To"] = receiver
-    msg["Subject"] = "【股票买入信号提醒】"
-
-    msg.attach(MIMEText(message, "plain", "utf-8"))
-
-    # 如果有图片附件
-    if image_path and os.path.exists(image_path):
-        try:
-            with open(image_path, "rb") as f:
-                img = MIMEApplication(f.read())
-                img.add_header("Content-Disposition", "attachment", filename=os.path.basename(image_path))
-                msg.attach(img)
-            print(f"✅ 成功添加图片附件: {image_path}")
-        except Exception as e:
-            print(f"❌ 添加图片附件失败: {e}")
-
-    try:
-        with smtplib.SMTP_SSL("smtp.qq.com", 465) as server:
-            server.login(sender, password)
-            server.send_message(msg)
-        print("📩 邮件发送成功！")
-        return True
-    except Exception as e:
-        print(f"❌ 邮件发送失败：{e}")
-        return False
+# ----------------- 函数 -----------------
+@register("BOLL", indicators=[("BOLL", {"N": BOLL_N, "P": BOLL_P})], min_bars=BOLL_N + 1, title="突破布林上轨")
+def boll_break(stock, bars, values):
+    """收盘价今日向上突破布林上轨（前一日收盘不高于上轨）"""
+    upper, mid, _ = values["BOLL"]
+    close = bars["close"].to_numpy(dtype=float)
+    if not close[-1] > upper[-1] or close[-2] > upper[-2]:
+        return None
+    return {
+        "date": bars["trade_date"].iloc[-1],
+        "price": float(close[-1]),
+        "text": f"当前价格：{close[-1]:.2f}\n"
+                f"布林上轨：{upper[-1]:.2f}（中轨 {mid[-1]:.2f}，{BOLL_N}日 {BOLL_P}倍标准差）\n"
+                f"状态：✅ 向上突破布林上轨\n",
+    }
@@ -0,0 +1,209 @@
+import io
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+
+import numpy as np
+
+# ----------------- 配置 -----------------
+# 图幅与分辨率（与原 plt.figure(figsize=(15, 8)) 默认 100dpi 一致）
+FIGSIZE = (15, 8)
+DPI = 100
+# 超出预算时逐步降低分辨率，最低到 MIN_DPI
+MIN_DPI = 50
+DPI_STEP = 0.8
+# 每张图的大小预算（字节），None 表示不限制
+MAX_BYTES = 300_000
+# 每张图的耗时预算（秒）：降分辨率重试不再超过它；批量渲染时超时未完成的图放弃并结束渲染进程。
+# 预算只限制本次运行等待多久，不会打断正在画的图：单进程渲染（只有一张图或 RENDER_WORKERS=1）时无法中途放弃
+TIME_BUDGET = 10
+# 一条折线最多绘制的点数，长历史按等间隔抽样（保留最后一根）
+MAX_POINTS = 600
+# 压缩输出：PNG 量化为 256 色调色板（需要 Pillow），WebP 按扩展名自动使用
+COMPACT = True
+WEBP_QUALITY = 80
+# 批量渲染的进程数
+RENDER_WORKERS = min(4, os.cpu_count() or 1)
+# 渲染进程的启动方式：不用 fork（主进程里可能还有获取超时的线程、邮件后台线程，fork 多线程进程可能让子进程死锁），
+# 子进程在干净的进程里导入本模块、建好 Figure 模板
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+# 中文字体备选（依次回退）
+FONT_FAMILY = ["DejaVu Sans", "SimHei", "Noto Sans CJK SC", "WenQuanYi Micro Hei", "Arial Unicode MS"]
+LABELS_CN = ("收盘价", "60日均线")
+LABELS_EN = ("Close Price", "60-day MA")
+
+_template = None
+_lock = threading.Lock()
+
+
+# ----------------- 函数 -----------------
+def ma60_job(df, title, filename, labels=LABELS_CN):
+    """由含 trade_date/close/ma60/above 列的K线表生成一个绘图任务（只含 NumPy 数组，便于发送到子进程）"""
+    return {
+        "dates": df["trade_date"].to_numpy(dtype="datetime64[ns]"),
+        "close": df["close"].to_numpy(dtype=float),
+        "ma": df["ma60"].to_numpy(dtype=float),
+        "above": df["above"].to_numpy(dtype=bool),
+        "title": title,
+        "filename": filename,
+        "labels": tuple(labels),
+    }
+
+
+def _downsample(job):
+    n = len(job["close"])
+    if n <= MAX_POINTS:
+        return job
+    idx = np.unique(np.r_[np.arange(0, n, -(-n // MAX_POINTS)), n - 1])
+    return {**job, **{k: job[k][idx] for k in ("dates", "close", "ma", "above")}}
+
+
+def _build_template():
+    """每个进程只建一次 Figure（面向对象 API + Agg 画布，不经过 pyplot 全局状态）"""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    import matplotlib
+
+    matplotlib.rcParams["font.sans-serif"] = FONT_FAMILY
+    matplotlib.rcParams["axes.unicode_minus"] = False
+    fig = Figure(figsize=FIGSIZE, dpi=DPI)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    close_line, = ax.plot([], [], linewidth=2)
+    ma_line, = ax.plot([], [], linestyle="--", linewidth=2)
+    ax.xaxis_date()
+    ax.tick_params(axis="x", labelrotation=45)
+    ax.grid(True, linestyle="--", alpha=0.6)
+    # 固定边距代替每张图的 tight_layout
+    fig.subplots_adjust(left=0.05, right=0.98, bottom=0.12, top=0.94)
+    return {"fig": fig, "canvas": canvas, "ax": ax, "close": close_line, "ma": ma_line, "fills": []}
+
+
+def _draw(job):
+    from matplotlib.dates import date2num
+
+    global _template
+    if _template is None:
+        _template = _build_template()
+    t = _template
+    ax = t["ax"]
+    x = date2num(job["dates"])
+    for fill in t["fills"]:
+        fill.remove()
+    t["close"].set_data(x, job["close"])
+    t["close"].set_label(job["labels"][0])
+    t["ma"].set_data(x, job["ma"])
+    t["ma"].set_label(job["labels"][1])
+    above = job["above"]
+    t["fills"] = [
+        ax.fill_between(x, job["close"], job["ma"], where=above, facecolor="green", alpha=0.3),
+        ax.fill_between(x, job["close"], job["ma"], where=~above, facecolor="red", alpha=0.3),
+    ]
+    ax.relim()
+    ax.autoscale_view()
+    ax.set_title(job["title"], fontsize=16)
+    ax.legend(handles=[t["close"], t["ma"]])
+    return t
+
+
+def _encode(t, fmt, dpi):
+    """按分辨率渲染并编码，返回字节串"""
+    fig, canvas = t["fig"], t["canvas"]
+    fig.set_dpi(dpi)
+    if COMPACT or fmt == "webp":
+        try:
+            from PIL import Image
+        except ImportError:
+            Image = None
+        if Image is not None:
+            canvas.draw()
+            img = Image.frombuffer("RGBA", canvas.get_width_height(), canvas.buffer_rgba(), "raw", "RGBA", 0, 1)
+            buf = io.BytesIO()
+            if fmt == "webp":
+                img.convert("RGB").save(buf, "WEBP", quality=WEBP_QUALITY, method=4)
+            else:
+                img.convert("RGB").quantize(256, method=Image.Quantize.FASTOCTREE).save(buf, "PNG", compress_level=6)
+            return buf.getvalue()
+    buf = io.BytesIO()
+    fig.savefig(buf, format=fmt, dpi=dpi)
+    return buf.getvalue()
+
+
+def render(job, max_bytes=MAX_BYTES, time_budget=TIME_BUDGET):
+    """渲染一张图到 job["filename"]（格式按扩展名：.png / .webp）。
+
+    超出大小预算时按 DPI_STEP 降低分辨率重试，直到满足预算、降到 MIN_DPI 或用完耗时预算。
+    返回 {"filename", "bytes", "dpi", "ms"}，失败返回 None。
+    """
+    start = time.perf_counter()
+    fmt = os.path.splitext(job["filename"])[1].lstrip(".").lower() or "png"
+    try:
+        with _lock:   # 同一进程内共用一个 Figure，线程之间串行
+            t = _draw(_downsample(job))
+            dpi = DPI
+            data = _encode(t, fmt, dpi)
+            while (max_bytes and len(data) > max_bytes and dpi * DPI_STEP >= MIN_DPI
+                   and time.perf_counter() - start < time_budget):
+                dpi = int(dpi * DPI_STEP)
+                data = _encode(t, fmt, dpi)
+        tmp = job["filename"] + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, job["filename"])
+    except Exception as e:
+        print(f"❌ 生成图表失败 {job['filename']}: {e}")
+        return None
+    ms = (time.perf_counter() - start) * 1e3
+    if max_bytes and len(data) > max_bytes:
+        print(f"⚠️ 图表 {job['filename']} 为 {len(data) // 1024}KB，超出预算 {max_bytes // 1024}KB")
+    return {"filename": job["filename"], "bytes": len(data), "dpi": dpi, "ms": ms}
+
+
+def _init_worker():
+    global _template
+    _template = _build_template()
+
+
+def _kill(processes):
+    """结束卡住的渲染进程（先 terminate，1 秒内没退出再 kill）"""
+    for p in processes:
+        if p.is_alive():
+            p.terminate()
+    for p in processes:
+        p.join(1)
+        if p.is_alive():
+            p.kill()
+
+
+def render_many(jobs, workers=RENDER_WORKERS, max_bytes=MAX_BYTES, time_budget=TIME_BUDGET):
+    """批量渲染：多张图时分布到进程池（每个进程复用一个 Figure），返回与 jobs 对应的结果列表。
+
+    超出整体耗时预算（time_budget x 每个进程分到的张数）仍未完成的图返回 None，并结束全部渲染进程，
+    卡住的图不会拖住解释器退出。
+    """
+    jobs = list(jobs)
+    workers = max(1, min(workers or 1, len(jobs)))
+    if workers == 1:
+        return [render(job, max_bytes, time_budget) for job in jobs]
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                               mp_context=multiprocessing.get_context(START_METHOD))
+    pending = ()
+    try:
+        futures = [pool.submit(render, job, max_bytes, time_budget) for job in jobs]
+        done, pending = wait(futures, timeout=time_budget * -(-len(jobs) // workers) + 5)
+        results = []
+        for job, future in zip(jobs, futures):
+            if future in done:
+                results.append(future.result())
+            else:
+                print(f"⚠️ 图表 {job['filename']} 超时未完成，已放弃")
+                results.append(None)
+        return results
+    finally:
+        # 只 shutdown(wait=False) 不会停下卡住的进程，解释器退出时仍会等它；超时时直接结束
+        processes = list((getattr(pool, "_processes", None) or {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+        if pending:
+            _kill(processes)
@@ -0,0 +1,38 @@
+from strategy_engine import register
+
+# ----------------- 函数 -----------------
+def _crossed_up(a, b):
+    """a 今日上穿 b（前一日 a <= b，今日 a > b）"""
+    return a[-2] <= b[-2] and a[-1] > b[-1]
+
+
+@register("MACD", indicators=["MACD"], min_bars=35, title="MACD金叉")
+def macd_golden(stock, bars, values):
+    """DIF 今日上穿 DEA"""
+    dif, dea, macd = values["MACD"]
+    if not _crossed_up(dif, dea):
+        return None
+    close = float(bars["close"].iloc[-1])
+    return {
+        "date": bars["trade_date"].iloc[-1],
+        "price": close,
+        "text": f"当前价格：{close:.2f}\n"
+                f"DIF：{dif[-1]:.3f}  DEA：{dea[-1]:.3f}  MACD：{macd[-1]:.3f}\n"
+                f"状态：✅ MACD金叉\n",
+    }
+
+
+@register("KDJ", indicators=["KDJ"], min_bars=10, title="KDJ金叉")
+def kdj_golden(stock, bars, values):
+    """K 今日上穿 D"""
+    k, d, j = values["KDJ"]
+    if not _crossed_up(k, d):
+        return None
+    close = float(bars["close"].iloc[-1])
+    return {
+        "date": bars["trade_date"].iloc[-1],
+        "price": close,
+        "text": f"当前价格：{close:.2f}\n"
+                f"K：{k[-1]:.2f}  D：{d[-1]:.2f}  J：{j[-1]:.2f}\n"
+                f"状态：✅ KDJ金叉\n",
+    }
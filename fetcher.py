@@ -0,0 +1,109 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# ----------------- 配置 -----------------
+# 每个数据源同时在途的请求数上限（按数据源名称共享，多个 fetch_all 调用之间也生效）
+SOURCE_LIMITS = {
+    "adata": 8,
+}
+DEFAULT_SOURCE_LIMIT = 4
+
+_source_lock = threading.Lock()
+_source_semaphores = {}
+
+
+class FetchTimeout(Exception):
+    """单次获取超过了超时时间（含等待数据源名额的时间）；attempt 为仍在进行中的那次请求"""
+
+    def __init__(self, message, attempt=None):
+        super().__init__(message)
+        self.attempt = attempt
+
+
+# ----------------- 函数 -----------------
+def _label(item):
+    """日志里显示的标的名称"""
+    return item.get("code", item) if isinstance(item, dict) else item
+
+
+def _source_semaphore(source, limit=None):
+    """取得数据源对应的并发信号量（首次使用时创建）"""
+    with _source_lock:
+        sem = _source_semaphores.get(source)
+        if sem is None:
+            limit = limit or SOURCE_LIMITS.get(source, DEFAULT_SOURCE_LIMIT)
+            sem = threading.BoundedSemaphore(limit)
+            _source_semaphores[source] = sem
+        return sem
+
+
+def _call_with_timeout(fn, item, sem, timeout, pending=None):
+    """在守护线程中执行一次获取，超时则放弃等待。
+
+    信号量在真正的请求结束后才释放，所以卡住的请求仍然占用数据源名额，
+    在途请求数不会超过上限；守护线程也不会阻止进程退出。
+    等待名额也计入超时。pending 为上次超时仍未结束的请求：继续等它，不再另占一个名额。
+    """
+    if pending is None:
+        if not sem.acquire(timeout=timeout):
+            raise FetchTimeout(f"等待数据源名额超过 {timeout}s")
+        box = {}
+
+        def run():
+            try:
+                box["result"] = fn(item)
+            except BaseException as e:
+                box["error"] = e
+            finally:
+                sem.release()
+
+        t = threading.Thread(target=run, daemon=True)
+        t.start()
+    else:
+        t, box = pending
+    t.join(timeout)
+    if t.is_alive():
+        raise FetchTimeout(f"超过 {timeout}s 未返回", (t, box))
+    if "error" in box:
+        raise box["error"]
+    return box.get("result")
+
+
+def fetch_one(item, fetch_fn, source="adata", timeout=20, retries=2, backoff=1.0):
+    """获取单个标的，失败或超时后按指数退避重试，全部失败返回 None"""
+    sem = _source_semaphore(source)
+    pending = None
+    for attempt in range(retries + 1):
+        try:
+            return _call_with_timeout(fetch_fn, item, sem, timeout, pending)
+        except Exception as e:
+            pending = getattr(e, "attempt", None)   # 超时的请求还在进行，重试时接着等它
+            if attempt >= retries:
+                print(f"❌ 获取 {_label(item)} 失败（已重试 {retries} 次）：{e}")
+                return None
+            delay = backoff * (2 ** attempt) + random.uniform(0, backoff)
+            print(f"获取 {_label(item)} 出错：{e}，{delay:.1f}s 后重试")
+            time.sleep(delay)
+
+
+def fetch_all(items, fetch_fn, source="adata", max_workers=16, timeout=20, retries=2, backoff=1.0):
+    """并发获取 items 中每个标的的数据，按完成先后产出 (item, result)。
+
+    - max_workers：本次调用的工作线程数
+    - 数据源并发上限见 SOURCE_LIMITS，同一数据源的所有调用共享
+    - timeout：单次请求超时（秒），retries：失败后重试次数，backoff：退避基数（秒）
+    失败或超时的标的 result 为 None。
+    """
+    items = list(items)
+    if not items:
+        return
+    workers = max(1, min(max_workers, len(items)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(fetch_one, item, fetch_fn, source, timeout, retries, backoff): item
+            for item in items
+        }
+        for future in as_completed(futures):
+            yield futures[future], future.result()
@@ -0,0 +1,99 @@
+import inspect
+import time
+
+import numpy as np
+
+import MyTT
+
+# ----------------- 配置 -----------------
+# MyTT 指标的输入参数名 -> K线表列名
+FIELDS = {
+    "CLOSE": "close",
+    "OPEN": "open",
+    "HIGH": "high",
+    "LOW": "low",
+    "VOL": "volume",
+}
+
+
+# ----------------- 函数 -----------------
+def _parse(spec):
+    """'MACD' / ('BOLL', {'N': 20}) / ('BOLL60', 'BOLL', {'N': 60}) -> (别名, 指标名, 参数)"""
+    if isinstance(spec, str):
+        return spec, spec, {}
+    if len(spec) == 2:
+        return spec[0], spec[0], dict(spec[1])
+    return spec[0], spec[1], dict(spec[2])
+
+
+class IndicatorPlan:
+    """在同一张K线表上一次计算一组 MyTT 指标。
+
+    各指标内部和指标之间相同的 MA/STD/HHV/LLV/EMA/SMA/SUM/REF/AVEDEV（同一输入、同样窗口）
+    只计算一次；完全相同的指标（同名同参数）也只计算一次。
+
+        plan = IndicatorPlan(["MACD", "KDJ", ("BOLL", {"N": 20}), "WR", "BIAS"])
+        values = plan.run(df)          # {"MACD": (DIF, DEA, MACD), "KDJ": (K, D, J), ...}
+        print(plan.format_report())
+
+    df 可以是单只股票的K线表，也可以是 {列名: 宽表} 的字典（行=日期，列=股票），见 MyTT 批量计算。
+    """
+
+    def __init__(self, specs):
+        self.items = []
+        for spec in specs:
+            alias, name, params = _parse(spec)
+            func = getattr(MyTT, name)
+            sig = inspect.signature(func)
+            inputs = [p for p in sig.parameters if p in FIELDS]
+            unknown = set(params) - set(sig.parameters)
+            if unknown:
+                raise ValueError(f"{name} 没有参数 {sorted(unknown)}")
+            key = (name, tuple(sorted(params.items())))
+            self.items.append((alias, func, inputs, params, key))
+        self.report = None
+
+    @property
+    def fields(self):
+        """计划需要的K线列"""
+        return sorted({f for _, _, inputs, _, _ in self.items for f in inputs})
+
+    def run(self, frame):
+        """计算全部指标，返回 {别名: 结果}，复用统计见 self.report"""
+        start = time.perf_counter()
+        # 每列只转换一次，各指标拿到的是同一个数组对象，缓存才能识别出相同的输入
+        data = {f: np.asarray(frame[FIELDS[f]], dtype=float) for f in self.fields}
+        results, done = {}, {}
+        with MyTT.SHARED() as shared:
+            for alias, func, inputs, params, key in self.items:
+                if key not in done:
+                    done[key] = func(*[data[f] for f in inputs], **params)
+                results[alias] = done[key]
+        stats = shared.stats
+        self.report = {
+            "indicators": len(self.items),
+            "indicators_computed": len(done),
+            "calls": sum(v[0] for v in stats.values()),
+            "computed": sum(v[1] for v in stats.values()),
+            "saved_ms": sum(v[2] for v in stats.values()) * 1e3,
+            "elapsed_ms": (time.perf_counter() - start) * 1e3,
+            "by_func": {
+                k: {"calls": v[0], "computed": v[1], "saved_ms": v[2] * 1e3}
+                for k, v in sorted(stats.items())
+            },
+        }
+        return results
+
+    def format_report(self):
+        """可读的复用统计"""
+        r = self.report
+        if r is None:
+            return "尚未运行"
+        lines = [
+            f"指标 {r['indicators']} 个（实际计算 {r['indicators_computed']} 个），"
+            f"基础函数调用 {r['calls']} 次，实际计算 {r['computed']} 次，"
+            f"复用 {r['calls'] - r['computed']} 次，估计节省 {r['saved_ms']:.2f}ms（本次耗时 {r['elapsed_ms']:.2f}ms）"
+        ]
+        for name, v in r["by_func"].items():
+            lines.append(f"  {name:<7}调用 {v['calls']:>3}  计算 {v['computed']:>3}  节省 {v['saved_ms']:.2f}ms")
+        return "\n".join(lines)
@@ -0,0 +1,166 @@
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+import Ashare
+import ma_state
+from fetcher import fetch_all
+
+# ----------------- 配置 -----------------
+TZ = ZoneInfo("Asia/Shanghai")
+# A股连续竞价时段
+SESSIONS = [("09:30", "11:30"), ("13:00", "15:00")]
+# 开盘前多久准备日K线和均线状态（分钟）
+PREPARE_MINUTES = 10
+# K线收盘后再等几秒拉取，确保数据源已经生成这根K线
+POLL_LAG = 3
+# 收盘后再拉取一次的宽限（秒），保证拿到 11:30 / 15:00 这根K线
+CLOSE_GRACE = 30
+# 休眠的最长时长（秒），避免系统休眠或改时间后睡过头
+MAX_SLEEP = 3600
+# 批量获取分钟线的并发数
+POLL_WORKERS = 16
+
+FREQ_SECONDS = {"1m": 60, "5m": 300}
+
+
+# ----------------- 函数 -----------------
+def now_cn():
+    return datetime.now(TZ)
+
+
+def _at(day, hhmm):
+    h, m = map(int, hhmm.split(":"))
+    return datetime(day.year, day.month, day.day, h, m, tzinfo=TZ)
+
+
+def next_open(now):
+    """now 之后（含）最近一次开盘时间；当天已收盘则返回第二天的第一个时段"""
+    for start, end in SESSIONS:
+        if now < _at(now, end):
+            return max(now, _at(now, start))
+    return _at(now + timedelta(days=1), SESSIONS[0][0])
+
+
+def in_session(now):
+    """是否在交易时段内（含收盘后 CLOSE_GRACE 秒）"""
+    grace = timedelta(seconds=CLOSE_GRACE)
+    return any(_at(now, s) <= now < _at(now, e) + grace for s, e in SESSIONS)
+
+
+def next_poll(now, frequency):
+    """下一根K线收盘后的拉取时间（按周期对齐到整分钟/整5分钟）"""
+    step = FREQ_SECONDS[frequency]
+    ts = now.timestamp()
+    return datetime.fromtimestamp((ts // step + 1) * step + POLL_LAG, TZ)
+
+
+def sleep_until(when):
+    """休眠到指定时间（单次最多 MAX_SLEEP 秒，调用方循环重新判断）"""
+    delay = (when - now_cn()).total_seconds()
+    if delay > 0:
+        time.sleep(min(delay, MAX_SLEEP))
+
+
+def to_ashare_code(code):
+    """600900 -> sh600900，000001 -> sz000001"""
+    return ("sh" if code.startswith(("5", "6", "9")) else "sz") + code
+
+
+class IntradayMonitor:
+    """盘中常驻监控：按交易时段轮询分钟线，用最新价增量更新60日线状态，站上即回调。
+
+    - load_bars(code)：返回日K线（前复权，trade_date 升序），开盘前用来准备均线状态
+    - on_signal(stock, state, bars)：新站上均线时调用，bars 末行是当天的最新价
+    - is_trade_day()：今天是否交易日
+    """
+
+    def __init__(self, stocks, load_bars, on_signal, is_trade_day, frequency="1m", window=60):
+        if frequency not in FREQ_SECONDS:
+            raise ValueError(f"不支持的周期 {frequency}，可选 {sorted(FREQ_SECONDS)}")
+        self.stocks = list(stocks)
+        self.load_bars = load_bars
+        self.on_signal = on_signal
+        self.is_trade_day = is_trade_day
+        self.frequency = frequency
+        self.window = window
+        self.day = None
+        self.bars = {}
+        self.states = {}
+        self.alerted = set()
+
+    def prepare(self):
+        """开盘前：读取截至昨天的日K线，建立均线状态"""
+        today = pd.Timestamp(self.day)
+        for stock, bars in fetch_all(self.stocks, lambda s: self.load_bars(s["code"])):
+            if bars is None:
+                continue
+            bars = bars[bars["trade_date"] < today]
+            self.bars[stock["code"]] = bars
+            self.states[stock["code"]] = ma_state.load(stock["code"], self.window).sync(bars)
+        print(f"{self.day} 已准备 {len(self.states)} 只股票的60日线状态")
+
+    def poll(self):
+        """拉取一次最新分钟线，更新状态并检查信号"""
+        codes = [s["code"] for s in self.stocks if s["code"] in self.states]
+        frames = Ashare.get_prices([to_ashare_code(c) for c in codes], count=1,
+                                   frequency=self.frequency, max_workers=POLL_WORKERS)
+        today = pd.Timestamp(self.day)
+        for stock in self.stocks:
+            code = stock["code"]
+            df = frames.get(to_ashare_code(code))
+            if df is None or df.empty or code in self.alerted:
+                continue
+            # 开盘前后数据源可能还在返回上一交易日的最后一根K线，停牌股全天如此；不能当成今天的收盘价
+            if df.index[-1].date() != self.day:
+                continue
+            quote_time = df.attrs.get("quote_time")   # 1m（腾讯）的最新价来自实时报价，也要是今天的
+            if quote_time is not None and quote_time.date() != self.day:
+                continue
+            price = float(df["close"].iloc[-1])
+            state = self.states[code]
+            state.update(today, price)   # 同一天重复更新只替换最后一根，O(1)
+            if state.crossed_up:
+                self.alerted.add(code)
+                bars = pd.concat([self.bars[code], pd.DataFrame({"trade_date": [today], "close": [price]})],
+                                 ignore_index=True)
+                self.on_signal(stock, state, bars)
+
+    def run_forever(self):
+        """常驻运行：交易时段内按周期轮询，其余时间休眠到下一个时段"""
+        print(f"盘中监控启动，共 {len(self.stocks)} 只股票，周期 {self.frequency}")
+        trading = False
+        while True:
+            now = now_cn()
+            if now.date() != self.day:
+                self.day, self.states, self.bars, self.alerted = now.date(), {}, {}, set()
+                trading = self.is_trade_day()
+                if not trading:
+                    print(f"{self.day} 非交易日，休眠到明天")
+            if not trading:
+                sleep_until(_at(now + timedelta(days=1), "00:01"))
+                continue
+
+            if in_session(now):
+                if not self.states:
+                    self.prepare()   # 盘中才启动
+                try:
+                    self.poll()
+                except Exception as e:
+                    print(f"❌ 拉取分钟线失败：{e}")
+                sleep_until(next_poll(now_cn(), self.frequency))
+                continue
+
+            opening = next_open(now)
+            if opening.date() != now.date():
+                sleep_until(opening)   # 今天已收盘
+                continue
+            prepare_at = opening - timedelta(minutes=PREPARE_MINUTES)
+            if now < prepare_at:
+                sleep_until(prepare_at)
+                continue
+            if not self.states:
+                self.prepare()
+            sleep_until(opening)   # 开盘前或午间休市
@@ -1,31 +1,46 @@
-import matplotlib.pyplot as plt
-from matplotlib import font_manager
 import os
 
+import chart_render
+import ma_state
+from strategy_engine import register
+
+# ----------------- 配置 -----------------
+MA_WINDOW = 60
+# 设置 MA_STATE_VERIFY=1 时每次用全量重算校验增量均线状态
+VERIFY_MA_STATE = os.getenv("MA_STATE_VERIFY") == "1"
+
+
+# ----------------- 函数 -----------------
 def plot_ma60(df, name, filename):
-    """绘制股价和60日均线图"""
-    try:
-        # 设置中文字体
-        plt.rcParams['font.sans-serif'] = ['DejaVu Sans', 'SimHei', 'Arial Unicode MS']  # 备用字体
-        plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
-        
-        plt.figure(figsize=(15,8))
-        plt.plot(df['trade_date'], df['close'], label='Close Price', linewidth=2)
-        plt.plot(df['trade_date'], df['ma60'], label='60-day MA', linestyle='--', linewidth=2)
-        above_mask = df['above']
-        plt.fill_between(df['trade_date'], df['close'], df['ma60'], where=above_mask, facecolor='green', alpha=0.3)
-        plt.fill_between(df['trade_date'], df['close'], df['ma60'], where=~above_mask, facecolor='red', alpha=0.3)
-        
-        # 使用英文标题避免字体问题
-        plt.title(f"{name} - Price vs 60-day Moving Average", fontsize=16)
-        plt.legend()
-        plt.xticks(rotation=45)
-        plt.grid(True, linestyle='--', alpha=0.6)
-        plt.tight_layout()
-        plt.savefig(filename)
-        plt.close()
-        print(f"✅ 成功生成图表: {filename}")
-        return True
-    except Exception as e:
-        print(f"❌ 生成图表失败: {e}")
+    """绘制股价和60日均线图（字体设置见 chart_render.FONT_FAMILY）"""
+    # 使用英文标题避免字体问题
+    job = chart_render.ma60_job(df, f"{name} - Price vs 60-day Moving Average", filename,
+                                labels=chart_render.LABELS_EN)
+    if chart_render.render(job) is None:   # 失败时 render 已打印原因
         return False
+    print(f"✅ 成功生成图表: {filename}")
+    return True
+
+
+def signal(state):
+    """由均线状态生成站上60日线的信号内容"""
+    return {
+        "date": state.last_date,
+        "price": state.last_close,
+        "text": f"当前价格：{state.last_close:.2f}\n"
+                f"60日均线：{state.ma:.2f}\n"
+                f"状态：✅ 站上60日线（建议关注买入机会）\n",
+    }
+
+
+@register("MA60", min_bars=MA_WINDOW, title="站上60日线")
+def ma60_cross(stock, bars, values):
+    """收盘价今日新站上60日线（增量均线状态，见 ma_state）"""
+    code = stock["code"]
+    # 增量更新均线状态：只处理上次之后的新K线
+    state = ma_state.load(code, MA_WINDOW).sync(bars)
+    if VERIFY_MA_STATE and not state.verify(bars):
+        print(f"⚠️ {stock['name']} 均线状态与全量计算不一致，已重建")
+        state = ma_state.MAState(MA_WINDOW).sync(bars)
+    ma_state.save(code, state)
+    return signal(state) if state.crossed_up else None
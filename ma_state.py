@@ -0,0 +1,164 @@
+import json
+import math
+import os
+import tempfile
+from collections import deque
+
+import pandas as pd
+
+# ----------------- 配置 -----------------
+# 增量均线状态目录，每只股票一个 JSON 文件
+STATE_DIR = os.getenv("MA_STATE_DIR", os.path.join("data", "state"))
+# 重叠K线收盘价允许的误差，超过说明历史数据被改写（如前复权重建），需要重建状态
+CLOSE_TOLERANCE = 0.005
+
+
+# ----------------- 函数 -----------------
+def ma_above(close, window=60):
+    """全量计算均线与“收盘价在均线之上”标记，close 可以是 Series 或宽表 DataFrame"""
+    ma = close.rolling(window=window, min_periods=1).mean()
+    return ma, close > ma
+
+
+class MAState:
+    """单只股票的增量均线 / 站上均线状态。
+
+    只保存最近 window 根K线的收盘价、它们的和，以及最后两根K线是否在均线之上，
+    新K线（或盘中最新价）到来时 O(1) 更新均线和穿越判断。
+    与 ma_above 一样在K线不足 window 根时按已有K线求平均（min_periods=1）。
+    """
+
+    def __init__(self, window=60):
+        self.window = window
+        self._reset()
+
+    def _reset(self):
+        self.dates = deque(maxlen=self.window)
+        self.closes = deque(maxlen=self.window)
+        self.total = 0.0
+        self.above = None        # 最后一根K线是否在均线之上
+        self.prev_above = None   # 倒数第二根K线是否在均线之上
+        self._updates = 0
+
+    @property
+    def last_date(self):
+        return self.dates[-1] if self.dates else None
+
+    @property
+    def last_close(self):
+        return self.closes[-1] if self.closes else None
+
+    @property
+    def ma(self):
+        return self.total / len(self.closes) if self.closes else None
+
+    @property
+    def crossed_up(self):
+        """今天新站上均线：上一根在均线下，最新一根在均线上"""
+        return bool(self.above) and self.prev_above is False
+
+    def update(self, date, close):
+        """加入一根K线；日期与最后一根相同时视为盘中更新，替换最后一根"""
+        date = pd.Timestamp(date).strftime("%Y-%m-%d")
+        close = float(close)
+        if self.dates and date < self.dates[-1]:
+            return  # 已经计入过的旧K线
+        if self.dates and date == self.dates[-1]:
+            self.total += close - self.closes[-1]
+            self.closes[-1] = close
+        else:
+            if len(self.closes) == self.window:
+                self.total -= self.closes[0]
+            self.prev_above = self.above
+            self.dates.append(date)
+            self.closes.append(close)
+            self.total += close
+            self._updates += 1
+            if self._updates % self.window == 0:
+                self.total = math.fsum(self.closes)  # 定期重新求和，消除累计误差
+        self.above = close > self.ma
+
+    def sync(self, df):
+        """用K线表（按 trade_date 升序）更新状态，只处理最后一根已存K线及之后的数据。
+
+        如果窗口内已收盘K线的价格与 df 对不上（历史被重建），从 df 尾部重建状态。
+        """
+        dates = df["trade_date"]
+        if not self.dates or not self._consistent(df):
+            self._reset()
+            start = max(0, len(df) - self.window - 1)
+        else:
+            start = dates.searchsorted(pd.Timestamp(self.dates[-1]))
+        for date, close in zip(dates.iloc[start:], df["close"].iloc[start:]):
+            self.update(date, close)
+        return self
+
+    def _consistent(self, df):
+        """比较窗口内（不含最后一根，可能是盘中数据）的收盘价"""
+        n = len(self.dates) - 1
+        if n < 1:
+            return True
+        first = df["trade_date"].searchsorted(pd.Timestamp(self.dates[0]))
+        part = df.iloc[first:first + n]
+        if len(part) < n or list(part["trade_date"].dt.strftime("%Y-%m-%d")) != list(self.dates)[:-1]:
+            return False
+        diff = part["close"].to_numpy(dtype=float) - list(self.closes)[:-1]
+        return bool((abs(diff) <= CLOSE_TOLERANCE).all())
+
+    def verify(self, df):
+        """全量重算校验当前状态，一致返回 True"""
+        ma, above = ma_above(df["close"].astype(float), self.window)
+        if len(df) < 2 or self.ma is None:
+            return False
+        return (
+            abs(ma.iloc[-1] - self.ma) <= 1e-6 * max(1.0, abs(self.ma))
+            and bool(above.iloc[-1]) == self.above
+            and bool(above.iloc[-2]) == self.prev_above
+        )
+
+    def to_dict(self):
+        return {
+            "window": self.window,
+            "dates": list(self.dates),
+            "closes": list(self.closes),
+            "above": self.above,
+            "prev_above": self.prev_above,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls(data["window"])
+        state.dates.extend(data["dates"])
+        state.closes.extend(data["closes"])
+        state.total = math.fsum(state.closes)
+        state.above = data["above"]
+        state.prev_above = data["prev_above"]
+        return state
+
+
+def state_path(code, window=60):
+    return os.path.join(STATE_DIR, f"{code}_ma{window}.json")
+
+
+def load(code, window=60):
+    """读取某只股票的均线状态，不存在或损坏时返回空状态"""
+    path = state_path(code, window)
+    try:
+        with open(path, encoding="utf-8") as f:
+            return MAState.from_dict(json.load(f))
+    except (OSError, ValueError, KeyError):
+        return MAState(window)
+
+
+def save(code, state):
+    """原子写入均线状态（临时文件名唯一，同一只股票并发保存时互不覆盖）"""
+    path = state_path(code, state.window)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with open(fd, "w", encoding="utf-8") as f:
+            json.dump(state.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
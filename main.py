@@ -1,10 +1,11 @@
 import os
-import matplotlib.pyplot as plt
-import pandas as pd
+import time
+import argparse
 from datetime import datetime
-from utils_email import send_email_if_signal
-import adata  # 获取股票行情数据
-import exchange_calendars as ecals
+import trade_calendar
+import timing
+# pandas、matplotlib（chart_render）、adata、Ashare 等较重的模块在函数内按需导入：
+# 非交易日只需要读本地交易日历，没有信号时也不需要画图和发邮件
 
 # ----------------- 配置 -----------------
 STOCK_LIST = [
@@ -25,81 +26,229 @@ STOCK_LIST = [
 #     {"code": "513950", "name": "恒生红利etf", "type": "etf"},
 #     {"code": "510300", "name": "沪深300ETF", "type": "etf"}  # 添加510300 ETF
 # ]
-# 初始化上交所交易日历
-XSHG = ecals.get_calendar("XSHG")
+# 并发获取：工作线程数、单次请求超时（秒）、失败重试次数、退避基数（秒）
+FETCH_WORKERS = 16
+FETCH_TIMEOUT = 20
+FETCH_RETRIES = 2
+FETCH_BACKOFF = 1.0
+# 启用的信号规则（见 strategy_engine；可选 MA60、BOLL、MACD、KDJ）。默认只有 MA60，其余规则需用环境变量开启，
+# 如 STRATEGY_RULES=MA60,BOLL；启用多条规则时，全部规则当天都提醒过的股票才会在获取数据前跳过
+STRATEGY_RULES = os.getenv("STRATEGY_RULES", "MA60").split(",")
 
 # ----------------- 函数 -----------------
 def is_trade_day():
-    """判断今天是否交易日"""
-    today = pd.Timestamp(datetime.now().date())
-    return today in XSHG.sessions_in_range(today, today)
+    """判断今天是否交易日（上交所日历，读取本地缓存）"""
+    return trade_calendar.is_trade_day()
 
-def get_stock_data(stock_code, days=120):
-    """获取股票日K线数据并计算60日均线"""
-    total_days = days + 60
-    df = adata.stock.market.get_market(
-        stock_code=stock_code,
+def load_bars(stock_code):
+    """获取股票日K线（前复权），数据不足60根返回 None"""
+    import bar_store  # 本地K线仓库（数据来自 adata）
+    # 从本地K线仓库增量更新，只下载上次之后的新K线
+    df = bar_store.update(
+        stock_code,
         k_type=1,       # 日K
         adjust_type=1   # 前复权
     )
     if df is None or df.empty or len(df) < 60:
         print(f"无法获取股票 {stock_code} 的数据")
         return None
+    return df.sort_values('trade_date')
+
+def add_ma60(df):
+    """全量计算60日均线与站上标记"""
+    import ma_state
+    df = df.copy()
+    df['ma60'], df['above'] = ma_state.ma_above(df['close'], 60)
+    return df
 
-    df['trade_date'] = pd.to_datetime(df['trade_date'])
-    df = df.sort_values('trade_date')
-    df['ma60'] = df['close'].rolling(window=60, min_periods=1).mean()
-    df['above'] = df['close'] > df['ma60']
-    return df.tail(days)
+def get_stock_data(stock_code, days=120):
+    """获取股票日K线数据并计算60日均线"""
+    df = load_bars(stock_code)
+    if df is None:
+        return None
+    return add_ma60(df).tail(days)
 
 def plot_stock_ma60(df, stock_name, filename):
     """绘制股票收盘价与60日均线"""
-    plt.figure(figsize=(15, 8))
-    plt.plot(df['trade_date'], df['close'], label='收盘价', linewidth=2)
-    plt.plot(df['trade_date'], df['ma60'], label='60日均线', linestyle='--', linewidth=2)
-    above_mask = df['above']
-    plt.fill_between(df['trade_date'], df['close'], df['ma60'], where=above_mask, facecolor='green', alpha=0.3)
-    plt.fill_between(df['trade_date'], df['close'], df['ma60'], where=~above_mask, facecolor='red', alpha=0.3)
-    plt.title(f"{stock_name} - 股价与60日均线", fontsize=16)
-    plt.legend()
-    plt.xticks(rotation=45)
-    plt.grid(True, linestyle='--', alpha=0.6)
-    plt.tight_layout()
-    plt.savefig(filename)
-    plt.close()
+    import chart_render
+    return chart_render.render(chart_render.ma60_job(df, f"{stock_name} - 股价与60日均线", filename))
 
 # ----------------- 主逻辑 -----------------
 def main():
-    if not is_trade_day():
+    timer = timing.RunTimer("main")   # 分阶段计时，结束时写入 data/metrics
+    with timer.stage("calendar"):
+        trading = is_trade_day()
+    if not trading:
         print("非交易日，跳过执行。")
+        timer.finish(symbols=0, signals=0)
         return
+    from signal_ledger import SignalLedger
+    from strategy_engine import StrategyEngine
 
-    for stock in STOCK_LIST:
-        code = stock["code"]
+    engine = StrategyEngine(STRATEGY_RULES, timer=timer)
+    ledger = SignalLedger()
+    # 今天已经提醒过全部规则的股票直接跳过，不再获取数据、画图、发邮件；只跳过部分规则的照常获取，但不再判断那些规则
+    today = trade_calendar.today()
+    done = {rule: ledger.done(rule, today) for rule in engine.names}
+    skip = {s["code"]: {rule for rule in engine.names if s["code"] in done[rule]} for s in STOCK_LIST}
+    stocks = [s for s in STOCK_LIST if len(skip[s["code"]]) < len(engine.names)]
+    if len(stocks) < len(STOCK_LIST):
+        print(f"今日已提醒过 {len(STOCK_LIST) - len(stocks)} 只股票，跳过：" +
+              ", ".join(s["code"] for s in STOCK_LIST if s not in stocks))
+
+    results = engine.run(
+        stocks,
+        load_bars,
+        skip=skip,
+        source="adata",
+        max_workers=FETCH_WORKERS,
+        timeout=FETCH_TIMEOUT,
+        retries=FETCH_RETRIES,
+        backoff=FETCH_BACKOFF,
+    )
+    # 按获取完成的先后顺序处理，信号集中起来一起画图、发邮件
+    signals = []
+    titles = {rule.name: rule.title for rule in engine.rules}
+    for stock, bars, hits in results:
         name = stock["name"]
-        df = get_stock_data(code)
-        if df is None:
-            continue
+        alerted = [titles[r] for r in engine.names if r in skip[stock["code"]]]   # 今天已提醒过、本次没有判断的规则
+        for hit in hits:
+            if ledger.seen(stock["code"], hit["rule"], hit["date"]):
+                print(f"{name} 的{hit['title']}信号（{str(hit['date'])[:10]}）已提醒过。")
+                alerted.append(hit["title"])
+        hits = [h for h in hits if not ledger.seen(stock["code"], h["rule"], h["date"])]
+        if hits:
+            print(f"✅ {name} 今日{'、'.join(h['title'] for h in hits)}，生成买入信号。")
+            signals.append((stock, bars, hits))
+        elif alerted:
+            print(f"{name} 今日已提醒过{'、'.join(alerted)}，跳过；其余规则未触发。")
+        else:
+            print(f"{name} 未触发买入信号。")
+    notify_signals(signals, ledger=ledger, timer=timer)
+    ledger.close()
+    timer.finish(symbols=len(stocks), signals=sum(len(hits) for _, _, hits in signals))
 
-        latest = df.iloc[-1]
-        prev = df.iloc[-2]
+def notify_signals(signals, outbox=None, ledger=None, timer=None):
+    """一批信号 (stock, bars, hits)：图表在进程池里并行渲染，再放入邮件队列合并成汇总邮件发送。
 
-        if not prev['above'] and latest['above']:
-            print(f"✅ {name} 今日新站上60日线，生成买入信号。")
-            # 修改文件名为中文名 + 股票代码
-            chart_file = f"{name}_{code}.png"
-            plot_stock_ma60(df, name, chart_file)
+    同一只股票触发的多条规则合成一条消息、一张图。
+    outbox 为常驻的 notifier.Notifier（后台发送、复用连接）；不给时临时建一个，发送完才返回。
+    ledger 为 signal_ledger.SignalLedger，邮件发送成功后才记录，发送失败的信号下次运行会重新提醒。
+    timer 为 timing.RunTimer，记录 render / notify 阶段耗时。
+    """
+    if not signals:
+        return
+    import chart_render
+    from notifier import Notifier
+    jobs = []
+    for stock, bars, hits in signals:
+        # 修改文件名为中文名 + 股票代码
+        chart_file = f"{stock['name']}_{stock['code']}.png"
+        jobs.append(chart_render.ma60_job(add_ma60(bars).tail(120), f"{stock['name']} - 股价与60日均线", chart_file))
+    charts = chart_render.render_many(jobs)
+    if timer is not None:   # 各图在进程池里的渲染耗时
+        for (stock, _, _), chart in zip(signals, charts):
+            if chart:
+                timer.add("render", chart["ms"] / 1e3, stock["code"])
 
-            msg = f"""【买入信号】{name} 站上60日线
+    start = time.perf_counter()
+    own = outbox is None
+    if own:
+        outbox = Notifier()
+    for (stock, bars, hits), chart in zip(signals, charts):
+        msg = f"""【买入信号】{stock['name']} {'、'.join(h['title'] for h in hits)}
 
 检测时间：{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-当前价格：{latest['close']:.2f}
-60日均线：{latest['ma60']:.2f}
-状态：✅ 站上60日线（建议关注买入机会）
-"""
-            send_email_if_signal(msg, chart_file)
-        else:
-            print(f"{name} 未触发买入信号。")
+""" + "\n".join(h["text"] for h in hits)
+        on_sent = None
+        if ledger is not None:
+            on_sent = (lambda code=stock["code"], hits=hits:
+                       [ledger.record(code, h["rule"], h["date"], h["price"]) for h in hits])
+        outbox.add(msg, chart["filename"] if chart else None, on_sent=on_sent)
+    if own:
+        outbox.close()   # 等待发送完成
+    if timer is not None:
+        timer.add("notify", time.perf_counter() - start)
+
+def run_daemon(frequency="1m"):
+    """盘中常驻监控：交易时段内按分钟线轮询，站上60日线即发送提醒"""
+    import intraday
+    import ma60_strategy
+    from notifier import Notifier
+    from signal_ledger import SignalLedger
+    from strategy_engine import RULES
+    outbox = Notifier()   # 整个监控期间共用一个邮件队列和 SMTP 连接
+    ledger = SignalLedger()
+
+    def on_signal(stock, state, bars):
+        # 与定时运行共用台账：同一交易日已提醒过的不再重复
+        rule = RULES["MA60"]
+        hit = {"rule": rule.name, "title": rule.title, **ma60_strategy.signal(state)}
+        if not ledger.seen(stock["code"], hit["rule"], hit["date"]):
+            notify_signals([(stock, bars, [hit])], outbox, ledger)
+
+    monitor = intraday.IntradayMonitor(
+        STOCK_LIST,
+        load_bars=load_bars,
+        on_signal=on_signal,
+        is_trade_day=is_trade_day,
+        frequency=frequency,
+    )
+    try:
+        monitor.run_forever()
+    except KeyboardInterrupt:
+        print("盘中监控已停止")
+    finally:
+        outbox.close()
+        ledger.close()
+
+def run_screen(universe=None, refresh=False, top=50, output=None):
+    """全市场筛选今日新站上60日线的股票（使用本地K线仓库的数据）"""
+    from fetcher import fetch_all
+    import screener
+    stocks = screener.load_universe(universe or None)
+    print(f"股票池共 {len(stocks)} 只")
+    if refresh:
+        for _ in fetch_all(stocks, lambda stock: load_bars(stock["code"]), source="adata",
+                           max_workers=FETCH_WORKERS, timeout=FETCH_TIMEOUT,
+                           retries=FETCH_RETRIES, backoff=FETCH_BACKOFF):
+            pass
+    start = time.perf_counter()
+    result = screener.screen(stocks, window=60)
+    print(f"筛选完成，用时 {time.perf_counter() - start:.2f}s，今日新站上60日线 {len(result)} 只")
+    if not result.empty:
+        print(result.head(top).to_string(index=False, float_format=lambda x: f"{x:.2f}"))
+    if output:
+        result.to_csv(output, index=False, encoding="utf-8-sig")
+        print(f"结果已保存到 {output}")
+    return result
+
 # ----------------- 执行 -----------------
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="A股60日线买入信号监控")
+    parser.add_argument("--screen", nargs="?", const="", metavar="CSV",
+                        help="全市场筛选模式：股票池 CSV（code,name），省略时使用本地K线仓库中的全部股票")
+    parser.add_argument("--refresh", action="store_true", help="筛选前先增量更新股票池的K线")
+    parser.add_argument("--top", type=int, default=50, help="打印排名前 N 的结果")
+    parser.add_argument("--output", help="筛选结果另存为 CSV")
+    parser.add_argument("--daemon", nargs="?", const="1m", choices=["1m", "5m"],
+                        help="盘中常驻监控模式，按分钟线（默认 1m）轮询")
+    parser.add_argument("--profile", nargs="?", const="", metavar="FILE",
+                        help="性能剖析，结果保存到 FILE（默认 data/metrics/profile-时间.prof 或 .html）")
+    parser.add_argument("--profiler", choices=["cprofile", "pyinstrument"], default="cprofile",
+                        help="剖析工具，pyinstrument 需另行安装")
+    args = parser.parse_args()
+
+    def run():
+        if args.daemon:
+            run_daemon(args.daemon)
+        elif args.screen is not None:
+            run_screen(args.screen, refresh=args.refresh, top=args.top, output=args.output)
+        else:
+            main()
+
+    if args.profile is not None:
+        with timing.profile(args.profile or None, engine=args.profiler):
+            run()
+    else:
+        run()
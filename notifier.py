@@ -0,0 +1,243 @@
+import json
+import os
+import queue
+import smtplib
+import threading
+import time
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+# ----------------- 配置 -----------------
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.qq.com")
+# 依次尝试的连接方式（方式:端口），上次成功的方式会排到最前面；
+# 本地调试可用 SMTP_HOST=127.0.0.1 SMTP_TRANSPORTS=plain:1025 配合 python -m aiosmtpd -n -l 127.0.0.1:1025
+SMTP_TRANSPORTS = os.getenv("SMTP_TRANSPORTS", "ssl:465,starttls:587,plain:25")
+# 单次连接/收发的超时（秒），只作用于这条 SMTP 连接，不修改全局 socket 超时
+SMTP_TIMEOUT = 15
+# 记住上次成功的连接方式
+TRANSPORT_CACHE = os.getenv("SMTP_TRANSPORT_CACHE", os.path.join("data", "state", "smtp_transport.json"))
+# 汇总邮件：收到信号后再等几秒，把同一批信号合并成一封；每封最多条数、附件总大小
+DIGEST_LINGER = 2.0
+DIGEST_MAX_ITEMS = 20
+DIGEST_MAX_BYTES = 10 * 1024 * 1024
+SUBJECT = "【股票买入信号提醒】"
+SEPARATOR = "\n" + "-" * 30 + "\n\n"
+
+
+# ----------------- 函数 -----------------
+def _parse_transports(spec):
+    items = []
+    for part in spec.split(","):
+        kind, _, port = part.strip().partition(":")
+        items.append((kind, int(port)))
+    return items
+
+
+def _load_last_transport(host):
+    try:
+        with open(TRANSPORT_CACHE, encoding="utf-8") as f:
+            data = json.load(f)
+        return (data["transport"], data["port"]) if data.get("host") == host else None
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _save_last_transport(host, transport):
+    try:
+        os.makedirs(os.path.dirname(TRANSPORT_CACHE) or ".", exist_ok=True)
+        with open(TRANSPORT_CACHE, "w", encoding="utf-8") as f:
+            json.dump({"host": host, "transport": transport[0], "port": transport[1]}, f)
+    except OSError as e:
+        print(f"⚠️ 无法保存邮件连接方式：{e}")
+
+
+class Notifier:
+    """邮件通知队列：收集信号合并成汇总邮件，复用一条已登录的 SMTP 连接，在后台线程发送。
+
+        with Notifier() as n:              # 退出时等待全部发送完成并断开连接
+            n.add(message, "chart.png")    # 立即返回，不阻塞信号检测
+
+    background=False 时不启动线程，由 send_digest() 同步发送。
+    """
+
+    def __init__(self, sender=None, password=None, receiver=None, host=None, transports=None, background=True):
+        self.sender = sender or os.getenv("QQ_EMAIL")
+        self.password = password or os.getenv("AUTH_CODE")
+        self.receiver = receiver or os.getenv("RECEIVER")
+        self.host = host or SMTP_HOST
+        self.transports = _parse_transports(transports or SMTP_TRANSPORTS)
+        self.server = None
+        self.transport = None
+        self.sent = 0
+        self.failed = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        if background:
+            self._thread = threading.Thread(target=self._worker, name="notifier", daemon=True)
+            self._thread.start()
+
+    # ----- 配置与连接 -----
+    def configured(self):
+        """检查邮件环境变量（本地无认证的 SMTP 服务可以不设 AUTH_CODE）"""
+        print(f"邮件配置检查 - 发件人: {self.sender}, 收件人: {self.receiver}")
+        if not self.sender or not self.receiver:
+            print("❌ 缺少邮件环境变量（QQ_EMAIL / AUTH_CODE / RECEIVER）")
+            print(f"当前环境变量 - QQ_EMAIL: {'已设置' if self.sender else '未设置'}, "
+                  f"AUTH_CODE: {'已设置' if self.password else '未设置'}, RECEIVER: {'已设置' if self.receiver else '未设置'}")
+            return False
+        return True
+
+    def _open(self, kind, port):
+        if kind == "ssl":
+            server = smtplib.SMTP_SSL(self.host, port, timeout=SMTP_TIMEOUT)
+        else:
+            server = smtplib.SMTP(self.host, port, timeout=SMTP_TIMEOUT)
+            if kind == "starttls":
+                server.starttls()
+        try:
+            server.ehlo_or_helo_if_needed()
+            if self.password and server.has_extn("auth"):
+                server.login(self.sender, self.password)
+        except Exception:
+            server.close()
+            raise
+        return server
+
+    def connect(self):
+        """建立连接：先试上次成功的方式，再依次尝试其余方式"""
+        if self.server is not None:
+            return self.server
+        last = _load_last_transport(self.host)
+        order = sorted(self.transports, key=lambda t: t != last)
+        for kind, port in order:
+            try:
+                print(f"尝试使用 {kind}:{port} 连接 {self.host}...")
+                self.server = self._open(kind, port)
+            except Exception as e:
+                print(f"{kind}:{port} 连接失败: {e}")
+                continue
+            self.transport = (kind, port)
+            if self.transport != last:
+                _save_last_transport(self.host, self.transport)
+            return self.server
+        raise ConnectionError("所有邮件连接方式均失败")
+
+    def disconnect(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except Exception:
+                self.server.close()
+            self.server = None
+
+    # ----- 组装与发送 -----
+    def build(self, items):
+        """把多条信号组装成一封邮件：正文依次排列，图表作为附件"""
+        msg = MIMEMultipart()
+        msg["From"] = self.sender
+        msg["To"] = self.receiver
+        msg["Subject"] = SUBJECT if len(items) == 1 else f"{SUBJECT}{len(items)} 个信号"
+        msg.attach(MIMEText(SEPARATOR.join(message for message, _, _ in items), "plain", "utf-8"))
+        for _, image_path, _ in items:
+            if not image_path or not os.path.exists(image_path):
+                continue
+            try:
+                with open(image_path, "rb") as f:
+                    img = MIMEApplication(f.read())
+                img.add_header("Content-Disposition", "attachment", filename=os.path.basename(image_path))
+                msg.attach(img)
+            except OSError as e:
+                print(f"❌ 添加图片附件失败: {e}")
+        return msg
+
+    def send_digest(self, items):
+        """同步发送一批 (message, image_path, on_sent)，成功后依次调用 on_sent()；返回是否成功"""
+        if not items:
+            return True
+        if not self.configured():
+            self.failed += len(items)
+            return False
+        msg = self.build(items)
+        for attempt in range(2):
+            reused = self.server is not None
+            try:
+                self.connect().send_message(msg)
+                break
+            except Exception as e:
+                self.disconnect()
+                if attempt or not reused:   # 复用的连接可能已被服务器断开，这种情况重连一次
+                    print(f"❌ 邮件发送失败：{e}")
+                    self.failed += len(items)
+                    return False
+        print(f"📩 邮件发送成功！({self.transport[0]}:{self.transport[1]}，{len(items)} 个信号)")
+        self.sent += len(items)
+        for _, _, on_sent in items:
+            if on_sent is not None:
+                on_sent()
+        return True
+
+    # ----- 队列 -----
+    def add(self, message, image_path=None, on_sent=None):
+        """加入一条信号；on_sent 在所在的邮件发送成功后调用"""
+        if self._thread is None:
+            return self.send_digest([(message, image_path, on_sent)])
+        self._queue.put((message, image_path, on_sent))
+        return True
+
+    def _batches(self, first):
+        """从队列里凑一批：等待 DIGEST_LINGER 秒内陆续到达的信号，受条数和附件大小限制"""
+        batch, size, stop = [first], 0, False
+        deadline = time.monotonic() + DIGEST_LINGER
+        while len(batch) < DIGEST_MAX_ITEMS:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if item is None:
+                stop = True
+                break
+            batch.append(item)
+        out, current = [], []
+        for item in batch:
+            path = item[1]
+            n = os.path.getsize(path) if path and os.path.exists(path) else 0
+            if current and size + n > DIGEST_MAX_BYTES:
+                out.append(current)
+                current, size = [], 0
+            current.append(item)
+            size += n
+        out.append(current)
+        return out, stop
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            batches, stop = self._batches(item)
+            for batch in batches:
+                try:
+                    self.send_digest(batch)
+                except Exception as e:   # 后台线程不能因为一封邮件退出
+                    print(f"❌ 邮件发送过程中发生异常: {e}")
+                    self.failed += len(batch)
+            if stop:
+                break
+        self.disconnect()
+
+    def close(self, timeout=None):
+        """等待队列中的信号全部发送完并断开连接；返回是否全部成功"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+        else:
+            self.disconnect()
+        return self.failed == 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
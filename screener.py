@@ -0,0 +1,122 @@
+import csv
+import os
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import bar_store
+import ma_state
+
+# ----------------- 配置 -----------------
+# 读取本地K线的线程数（Parquet 读取会释放 GIL）
+LOAD_WORKERS = 8
+# 每只股票最近K线的缓存，按K线文件的修改时间失效，全市场重复筛选时只需重新读取有更新的文件
+TAIL_CACHE = os.path.join(bar_store.BAR_STORE_DIR, "_tails.pkl")
+
+
+# ----------------- 函数 -----------------
+def load_universe(path=None):
+    """读取股票池：CSV 文件（code,name 列，或每行一个代码）；不给文件时用本地K线仓库里的全部代码"""
+    if path is None:
+        return [{"code": code, "name": code} for code in bar_store.list_codes()]
+    stocks = []
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        for row in csv.reader(f):
+            if not row or not row[0].strip() or row[0].strip().lower() == "code":
+                continue
+            code = row[0].strip()
+            name = row[1].strip() if len(row) > 1 and row[1].strip() else code
+            stocks.append({"code": code, "name": name})
+    return stocks
+
+
+def _load_tail_cache(bars):
+    try:
+        with open(TAIL_CACHE, "rb") as f:
+            cache = pickle.load(f)
+        return cache["tails"] if cache.get("bars") == bars else {}
+    except (OSError, pickle.PickleError, EOFError, KeyError):
+        return {}
+
+
+def _save_tail_cache(bars, tails):
+    os.makedirs(os.path.dirname(TAIL_CACHE), exist_ok=True)
+    tmp = TAIL_CACHE + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump({"bars": bars, "tails": tails}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, TAIL_CACHE)
+
+
+def load_tails(codes, bars):
+    """读取每只股票自己最近 bars 根K线的收盘价（不按日期对齐，停牌日本来就没有K线）。
+
+    返回 (closes, last_dates)：closes 为 bars x 股票数 的数组，K线不足的在前面补 NaN；
+    last_dates 为每只股票最后一根K线的日期（没有数据为 NaT）。
+    """
+    cache = _load_tail_cache(bars)
+
+    def tail(code):
+        try:
+            mtime = os.stat(bar_store.bar_path(code)).st_mtime_ns
+        except OSError:
+            return code, None
+        hit = cache.get(code)
+        if hit is not None and hit[0] == mtime:
+            return code, hit
+        df = bar_store.load(code, columns=["close"])
+        if df is None or df.empty:
+            return code, None
+        df = df.tail(bars)
+        return code, (mtime, df["close"].to_numpy(dtype=float), df["trade_date"].iloc[-1].to_datetime64())
+
+    closes = np.full((bars, len(codes)), np.nan)
+    last_dates = np.full(len(codes), np.datetime64("NaT"), dtype="datetime64[ns]")
+    tails, changed = {}, False
+    with ThreadPoolExecutor(max_workers=LOAD_WORKERS) as pool:
+        for j, (code, item) in enumerate(pool.map(tail, codes)):
+            if item is None:
+                continue
+            tails[code] = item
+            changed |= cache.get(code) is not item
+            values = item[1]
+            closes[bars - len(values):, j] = values
+            last_dates[j] = item[2]
+    if changed:
+        _save_tail_cache(bars, {**cache, **tails})
+    return closes, last_dates
+
+
+def screen(stocks, window=60, as_of=None):
+    """全市场“今日新站上均线”筛选，返回按站上幅度排序的结果表。
+
+    判定与 main() 相同：前一根K线收盘价不在均线之上、最新一根在均线之上（均线按
+    ma_state.ma_above 计算），K线不少于 window 根，且最新K线日期为 as_of（默认取全体最新日期）。
+    所有股票放在一个 (window+1) x 股票数 的数组里一次计算。
+    """
+    codes = [s["code"] for s in stocks]
+    closes, last_dates = load_tails(codes, window + 1)
+    ma, above = ma_state.ma_above(pd.DataFrame(closes), window)
+    ma, above = ma.to_numpy(), above.to_numpy()
+
+    if as_of is None:
+        as_of = np.nanmax(last_dates) if (~np.isnat(last_dates)).any() else None
+    else:
+        as_of = np.datetime64(pd.Timestamp(as_of))
+    enough = (~np.isnan(closes)).sum(axis=0) >= window
+    hit = enough & (last_dates == as_of) & ~above[-2] & above[-1]
+
+    idx = np.flatnonzero(hit)
+    result = pd.DataFrame({
+        "code": [codes[j] for j in idx],
+        "name": [stocks[j]["name"] for j in idx],
+        "trade_date": last_dates[idx],
+        "close": closes[-1, idx],
+        f"ma{window}": ma[-1, idx],
+        "pct_above": (closes[-1, idx] / ma[-1, idx] - 1) * 100,
+        "prev_pct": (closes[-2, idx] / ma[-2, idx] - 1) * 100,
+    })
+    result = result.sort_values("pct_above", ascending=False, ignore_index=True)
+    result.insert(0, "rank", np.arange(1, len(result) + 1))
+    return result
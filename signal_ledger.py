@@ -0,0 +1,101 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+# ----------------- 配置 -----------------
+# 已发送信号的记录，按 (代码, 规则, 交易日) 去重，同一交易日多次运行只提醒一次
+LEDGER_PATH = os.getenv("SIGNAL_LEDGER", os.path.join("data", "state", "signals.sqlite3"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS signals (
+    code         TEXT NOT NULL,
+    rule         TEXT NOT NULL,
+    session_date TEXT NOT NULL,
+    price        REAL,
+    detail       TEXT,
+    sent_at      TEXT NOT NULL,
+    PRIMARY KEY (code, rule, session_date)
+) WITHOUT ROWID
+"""
+
+
+# ----------------- 函数 -----------------
+def _day(d):
+    """date / datetime / pandas.Timestamp / 'YYYY-MM-DD' -> 'YYYY-MM-DD'"""
+    if isinstance(d, str):
+        return d[:10]
+    if isinstance(d, datetime):
+        d = d.date()
+    return d.isoformat()
+
+
+class SignalLedger:
+    """信号台账（SQLite）：记录已经成功发送提醒的 (代码, 规则, 交易日)。
+
+        with SignalLedger() as ledger:
+            done = ledger.done("MA60", today)          # 今天已提醒过的代码，运行前直接跳过
+            ...
+            ledger.record(code, "MA60", bar_date, price)   # 邮件发送成功后再记录
+
+    record 可能在邮件后台线程中调用，内部加锁。
+    """
+
+    def __init__(self, path=LEDGER_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+
+    def done(self, rule, session_date):
+        """某规则在某交易日已提醒过的代码集合"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT code FROM signals WHERE rule = ? AND session_date = ?", (rule, _day(session_date))
+            ).fetchall()
+        return {code for code, in rows}
+
+    def seen(self, code, rule, session_date):
+        """是否已提醒过"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM signals WHERE code = ? AND rule = ? AND session_date = ?",
+                (code, rule, _day(session_date)),
+            ).fetchone()
+        return row is not None
+
+    def record(self, code, rule, session_date, price=None, detail=None):
+        """记录一次已发送的提醒（重复记录忽略）"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO signals (code, rule, session_date, price, detail, sent_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (code, rule, _day(session_date), price, detail, datetime.now().isoformat(timespec="seconds")),
+            )
+            self._conn.commit()
+
+    def history(self, code=None, rule=None, limit=100):
+        """最近的提醒记录，按交易日倒序"""
+        sql, args = "SELECT code, rule, session_date, price, detail, sent_at FROM signals WHERE 1 = 1", []
+        if code is not None:
+            sql += " AND code = ?"
+            args.append(code)
+        if rule is not None:
+            sql += " AND rule = ?"
+            args.append(rule)
+        sql += " ORDER BY session_date DESC, sent_at DESC LIMIT ?"
+        args.append(limit)
+        with self._lock:
+            return self._conn.execute(sql, args).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
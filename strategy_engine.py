@@ -0,0 +1,119 @@
+import importlib
+
+from fetcher import fetch_all
+from indicator_plan import IndicatorPlan
+from timing import stage
+
+# ----------------- 配置 -----------------
+# 定义规则的模块，导入时通过 @register 登记到 RULES
+STRATEGY_MODULES = ["ma60_strategy", "boll_strategy", "cross_strategy"]
+
+RULES = {}
+
+
+# ----------------- 函数 -----------------
+class Rule:
+    """一条信号规则：在同一张K线表和共享的指标结果上判断是否触发"""
+
+    def __init__(self, name, func, indicators=(), min_bars=1, title=None):
+        self.name = name
+        self.func = func
+        self.indicators = list(indicators)
+        self.min_bars = min_bars
+        self.title = title or name
+
+    def __repr__(self):
+        return f"Rule({self.name!r})"
+
+
+def register(name, indicators=(), min_bars=1, title=None):
+    """登记规则的装饰器。
+
+        @register("BOLL", indicators=[("BOLL", {"N": 20, "P": 2})], min_bars=21, title="突破布林上轨")
+        def boll_break(stock, bars, values):
+            ...   # 触发时返回 {"date", "price", "text"}，否则返回 None
+
+    indicators 为 IndicatorPlan 的指标声明，values 是按别名取的计算结果；不同规则声明的同一指标只算一次。
+    """
+    def wrap(func):
+        RULES[name] = Rule(name, func, indicators, min_bars, title)
+        return func
+    return wrap
+
+
+def load_strategies():
+    """导入全部策略模块，返回已登记的规则"""
+    for module in STRATEGY_MODULES:
+        importlib.import_module(module)
+    return RULES
+
+
+class StrategyEngine:
+    """多规则信号引擎：每只股票只获取一次K线、把所有规则需要的指标合并成一个 IndicatorPlan 只算一遍，
+    再依次判断全部规则。
+
+        engine = StrategyEngine(["MA60", "BOLL"])
+        for stock, bars, hits in engine.run(stocks, load_bars):
+            ...   # hits 为触发的信号列表
+    """
+
+    def __init__(self, rules=None, timer=None):
+        self.timer = timer   # timing.RunTimer：按股票记录 fetch / compute / signal 各阶段耗时
+        load_strategies()
+        names = list(RULES) if rules is None else list(rules)
+        unknown = [n for n in names if n not in RULES]
+        if unknown:
+            raise ValueError(f"未知规则 {unknown}，可选 {sorted(RULES)}")
+        self.rules = [RULES[n] for n in names]
+
+        specs, seen = [], {}
+        for rule in self.rules:
+            for spec in rule.indicators:
+                alias = spec if isinstance(spec, str) else spec[0]
+                if alias in seen:
+                    if seen[alias] != spec:
+                        raise ValueError(f"规则 {rule.name} 的指标 {alias} 与其他规则的声明不同")
+                    continue
+                seen[alias] = spec
+                specs.append(spec)
+        self.plan = IndicatorPlan(specs)
+
+    @property
+    def names(self):
+        return [rule.name for rule in self.rules]
+
+    def evaluate(self, stock, bars, skip=()):
+        """在一张K线表上判断全部规则（skip 中的规则跳过），返回触发的信号列表"""
+        rules = [r for r in self.rules if r.name not in skip and len(bars) >= r.min_bars]
+        if not rules:
+            return []
+        code = stock["code"]
+        with stage(self.timer, "compute", code):
+            values = self.plan.run(bars) if self.plan.items else {}
+        hits = []
+        with stage(self.timer, "signal", code):
+            for rule in rules:
+                try:
+                    hit = rule.func(stock, bars, values)
+                except Exception as e:
+                    print(f"❌ {stock['name']} 规则 {rule.name} 计算失败：{e}")
+                    continue
+                if hit:
+                    hits.append({"rule": rule.name, "title": rule.title, **hit})
+        return hits
+
+    def run(self, stocks, load, skip=None, **fetch_kw):
+        """并发获取每只股票的K线（每只一次）并判断全部规则，按完成顺序产出 (stock, bars, hits)。
+
+        load(code) 返回K线表或 None；skip 为 {代码: 已处理的规则集合}；fetch_kw 传给 fetcher.fetch_all。
+        """
+        skip = skip or {}
+
+        def fetch(s):
+            with stage(self.timer, "fetch", s["code"]):
+                return load(s["code"])
+
+        for stock, bars in fetch_all(stocks, fetch, **fetch_kw):
+            if bars is None:
+                continue
+            yield stock, bars, self.evaluate(stock, bars, skip.get(stock["code"], ()))
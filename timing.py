@@ -0,0 +1,164 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+# ----------------- 配置 -----------------
+# 每次运行追加一行 JSON（设为空字符串关闭）
+TIMING_LOG = os.getenv("TIMING_LOG", os.path.join("data", "metrics", "timing.jsonl"))
+# Prometheus textfile（node_exporter --collector.textfile.directory 读取；设为空字符串关闭）
+TIMING_PROM = os.getenv("TIMING_PROM", os.path.join("data", "metrics", "ma60_monitor.prom"))
+# --profile 的输出目录
+PROFILE_DIR = os.path.join("data", "metrics")
+METRIC_PREFIX = "ma60_monitor"
+# 各阶段的中文名（打印汇总用）
+STAGE_NAMES = {
+    "calendar": "交易日历",
+    "fetch": "获取",
+    "compute": "指标计算",
+    "signal": "信号判断",
+    "render": "画图",
+    "notify": "发送",
+}
+
+
+# ----------------- 函数 -----------------
+class RunTimer:
+    """一次运行的分阶段计时：按阶段累计全程耗时，也按股票累计每只的耗时。
+
+        timer = RunTimer("main")
+        with timer.stage("fetch", code):
+            ...
+        timer.finish(signals=2)    # 写入 JSON 行和 Prometheus 文件，打印汇总
+
+    获取在多个线程里并发进行，各只股票的 fetch 耗时之和会大于这一阶段的实际用时，实际用时见 elapsed_s。
+    """
+
+    def __init__(self, mode="main"):
+        self.mode = mode
+        self.started = datetime.now()
+        self._start = time.perf_counter()
+        self.stages = defaultdict(float)
+        self.symbols = defaultdict(lambda: defaultdict(float))
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds, code=None):
+        with self._lock:
+            self.stages[name] += seconds
+            if code is not None:
+                self.symbols[code][name] += seconds
+
+    @contextmanager
+    def stage(self, name, code=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start, code)
+
+    def record(self, **extra):
+        """本次运行的计时记录（秒，保留 4 位小数）"""
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "started": self.started.isoformat(timespec="seconds"),
+                "elapsed_s": round(time.perf_counter() - self._start, 4),
+                **extra,
+                "stages": {k: round(v, 4) for k, v in self.stages.items()},
+                "per_symbol": {
+                    code: {k: round(v, 4) for k, v in stages.items()} for code, stages in sorted(self.symbols.items())
+                },
+            }
+
+    def finish(self, **extra):
+        """结束计时：写入 JSON 行、Prometheus 文件并打印汇总，返回记录"""
+        rec = self.record(**extra)
+        try:
+            if TIMING_LOG:
+                write_jsonl(rec, TIMING_LOG)
+            if TIMING_PROM:
+                write_prometheus(rec, TIMING_PROM)
+        except OSError as e:
+            print(f"⚠️ 无法写入计时记录：{e}")
+        parts = [f"{STAGE_NAMES.get(k, k)} {v:.2f}s" for k, v in rec["stages"].items()]
+        print(f"⏱️ 耗时：{' / '.join(parts) or '无'}，共 {rec['elapsed_s']:.2f}s")
+        return rec
+
+
+def stage(timer, name, code=None):
+    """timer 为 None 时不计时"""
+    return timer.stage(name, code) if timer is not None else nullcontext()
+
+
+def write_jsonl(rec, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+
+def write_prometheus(rec, path):
+    """按 Prometheus 文本格式原子写入最近一次运行的指标"""
+    p = METRIC_PREFIX
+    mode = rec["mode"]
+    lines = [
+        f"# HELP {p}_run_seconds Wall time of the last run.",
+        f"# TYPE {p}_run_seconds gauge",
+        f'{p}_run_seconds{{mode="{mode}"}} {rec["elapsed_s"]}',
+        f"# HELP {p}_last_run_timestamp_seconds Start time of the last run.",
+        f"# TYPE {p}_last_run_timestamp_seconds gauge",
+        f'{p}_last_run_timestamp_seconds{{mode="{mode}"}} {datetime.fromisoformat(rec["started"]).timestamp():.0f}',
+        f"# HELP {p}_stage_seconds Time spent per stage in the last run (summed over symbols).",
+        f"# TYPE {p}_stage_seconds gauge",
+    ]
+    lines += [f'{p}_stage_seconds{{mode="{mode}",stage="{k}"}} {v}' for k, v in rec["stages"].items()]
+    lines += [
+        f"# HELP {p}_symbol_stage_seconds Time spent per symbol and stage in the last run.",
+        f"# TYPE {p}_symbol_stage_seconds gauge",
+    ]
+    for code, stages in rec["per_symbol"].items():
+        lines += [f'{p}_symbol_stage_seconds{{mode="{mode}",code="{code}",stage="{k}"}} {v}' for k, v in stages.items()]
+    for key in ("symbols", "signals"):
+        if key in rec:
+            lines += [f"# TYPE {p}_{key} gauge", f'{p}_{key}{{mode="{mode}"}} {rec[key]}']
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp, path)
+
+
+@contextmanager
+def profile(path=None, engine="cprofile", top=25):
+    """性能剖析：cProfile（默认，结果可用 snakeviz 等查看）或 pyinstrument（需另行安装，输出 HTML）"""
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    if engine == "pyinstrument":
+        from pyinstrument import Profiler
+        path = path or os.path.join(PROFILE_DIR, f"profile-{stamp}.html")
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(profiler.output_html())
+            print(profiler.output_text(unicode=True, color=False))
+            print(f"性能剖析已保存到 {path}")
+        return
+
+    import cProfile
+    import pstats
+    path = path or os.path.join(PROFILE_DIR, f"profile-{stamp}.prof")
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(top)
+        print(f"性能剖析已保存到 {path}")
@@ -1,5 +1,173 @@
-from datetime import datetime
+import os
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
 
-def is_trade_day():
-    today = datetime.now().weekday()
-    return today < 5  # 周一至周五
+# ----------------- 配置 -----------------
+# 交易日缓存文件：int32 数组，前两个数是覆盖范围的首尾日期序号，其后为升序的交易日序号（date.toordinal()）
+CALENDAR_FILE = os.getenv("TRADE_CALENDAR_FILE", os.path.join("data", "calendar", "XSHG.bin"))
+# exchange_calendars 中的交易所代码
+EXCHANGE = "XSHG"
+# 缓存覆盖范围只剩这么多天时，尝试用 exchange_calendars 重建（每天最多一次，以缓存文件的修改时间为上次尝试时间；
+# 已安装的 exchange_calendars 本身也只覆盖到某一天，重建未必能延长范围）
+REFRESH_DAYS = 30
+TZ = ZoneInfo("Asia/Shanghai")
+
+_cal = None
+
+
+# ----------------- 函数 -----------------
+def _ordinal(d):
+    """date / datetime / pandas.Timestamp / 'YYYY-MM-DD' -> 日期序号"""
+    if isinstance(d, str):
+        d = date.fromisoformat(d[:10])
+    elif isinstance(d, datetime):
+        d = d.date()
+    return d.toordinal()
+
+
+def today():
+    """上海时区的今天"""
+    return datetime.now(TZ).date()
+
+
+def build(path=CALENDAR_FILE, old=None):
+    """用 exchange_calendars 生成交易日缓存文件（只在缓存缺失或快过期时调用）。
+    覆盖范围没有比 old 更新时不重写文件，只更新修改时间，记下今天已经尝试过。"""
+    import exchange_calendars as ecals
+    cal = ecals.get_calendar(EXCHANGE)
+    data = array("i", [cal.first_session.toordinal(), cal.last_session.toordinal()])
+    data.extend(ts.toordinal() for ts in cal.sessions)
+    if old is not None and len(old) >= 2 and data[1] <= old[1] and os.path.exists(path):
+        _touch(path)
+        return old
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        data.tofile(f)
+    os.replace(tmp, path)
+    return data
+
+
+def _touch(path):
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def _tried_today(path):
+    """缓存文件今天是否已经写过或尝试重建过"""
+    try:
+        return datetime.fromtimestamp(os.path.getmtime(path), TZ).date() == today()
+    except OSError:
+        return False
+
+
+def _read(path):
+    data = array("i")
+    with open(path, "rb") as f:
+        data.frombytes(f.read())
+    return data
+
+
+class _Calendar:
+    """内存中的交易日表：升序序号数组（二分查找）+ 按日偏移的位图（O(1) 判断）"""
+
+    def __init__(self, data):
+        self.first, self.last = data[0], data[1]
+        self.sessions = data[2:]
+        self.bitmap = bytearray(max(self.last - self.first + 1, 0))
+        for o in self.sessions:
+            self.bitmap[o - self.first] = 1
+
+    def covers(self, o):
+        return self.first <= o <= self.last
+
+
+def _load():
+    """读取缓存（不存在或快过期时重建）；没有缓存也装不了 exchange_calendars 时返回空日历"""
+    global _cal
+    if _cal is not None:
+        return _cal
+    data = None
+    if os.path.exists(CALENDAR_FILE):
+        data = _read(CALENDAR_FILE)
+    if data is None or len(data) < 2:
+        data = None
+    stale = data is None or data[1] - today().toordinal() < REFRESH_DAYS
+    if stale and (data is None or not _tried_today(CALENDAR_FILE)):
+        try:
+            data = build(old=data)
+        except Exception as e:
+            if data is None:
+                print(f"⚠️ 无法生成交易日历（{e}），按周一至周五判断交易日")
+                data = array("i", [1, 0])   # 空范围，全部走周一至周五判断
+            else:
+                _touch(CALENDAR_FILE)   # 今天不再重试
+    _cal = _Calendar(data)
+    return _cal
+
+
+def _weekday(o):
+    return date.fromordinal(o).weekday() < 5
+
+
+def is_session(d):
+    """是否交易日；超出日历覆盖范围时按周一至周五判断"""
+    o = _ordinal(d)
+    cal = _load()
+    if not cal.covers(o):
+        return _weekday(o)
+    return cal.bitmap[o - cal.first] == 1
+
+
+def next_session(d):
+    """d 之后（不含）的第一个交易日"""
+    o = _ordinal(d)
+    cal = _load()
+    if cal.covers(o):
+        i = bisect_right(cal.sessions, o)
+        if i < len(cal.sessions):
+            return date.fromordinal(cal.sessions[i])
+    o += 1
+    while not is_session(o_date := date.fromordinal(o)):
+        o += 1
+    return o_date
+
+
+def previous_session(d):
+    """d 之前（不含）的最后一个交易日"""
+    o = _ordinal(d)
+    cal = _load()
+    if cal.covers(o):
+        i = bisect_left(cal.sessions, o)
+        if i > 0:
+            return date.fromordinal(cal.sessions[i - 1])
+    o -= 1
+    while not is_session(o_date := date.fromordinal(o)):
+        o -= 1
+    return o_date
+
+
+def sessions_between(start, end):
+    """start 到 end（含两端）之间的全部交易日"""
+    lo, hi = _ordinal(start), _ordinal(end)
+    cal = _load()
+    if not (cal.covers(lo) and cal.covers(hi)):
+        return [date.fromordinal(o) for o in range(lo, hi + 1) if is_session(date.fromordinal(o))]
+    i, j = bisect_left(cal.sessions, lo), bisect_right(cal.sessions, hi)
+    return [date.fromordinal(o) for o in cal.sessions[i:j]]
+
+
+def is_trade_day(d=None):
+    """判断某天（默认今天）是否交易日"""
+    return is_session(today() if d is None else d)
+
+
+# ----------------- 执行 -----------------
+if __name__ == "__main__":
+    data = build()
+    print(f"已生成 {CALENDAR_FILE}：{len(data) - 2} 个交易日，"
+          f"{date.fromordinal(data[0])} ~ {date.fromordinal(data[1])}，{os.path.getsize(CALENDAR_FILE)} 字节")